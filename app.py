@@ -2,7 +2,13 @@ import gradio as gr
 import tempfile
 import os
 
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from src.config import Config
 from src.main import main  # or main_pipeline if you renamed it
+from src.warmup import health, warm_up_in_background
 
 
 def analyze(audio):
@@ -25,20 +31,21 @@ def analyze(audio):
     else:
         filepath = audio
 
-    # Run your pipeline
-    results = main(filepath)
+    # Run your pipeline; each call gets its own output directory because
+    # the queue runs several analyses at once. The outputs are read back
+    # into memory (Gradio writes its own copies) so the directory can go
+    with tempfile.TemporaryDirectory(prefix="analysis-") as outdir:
+        results = main(filepath, outdir=outdir, render_png=True)
 
-    # You decide what main() returns:
-    # Example:
-    # results = {
-    #   "resynth_path": "...wav",
-    #   "pitch_plot": "...png",
-    #   "notes": [...]
-    # }
+        import soundfile as sf
+        from PIL import Image
+        y, sr = sf.read(results["resynth_path"], dtype="float32")
+        with Image.open(results["pitch_plot"]) as im:
+            plot = im.copy()
 
     return (
-        results["resynth_path"],
-        results["pitch_plot"],
+        (sr, y),
+        plot,
         results["notes"]
     )
 
@@ -55,4 +62,22 @@ demo = gr.Interface(
     description="Upload a vocal recording and see pitch, rhythm, and note analysis."
 )
 
-demo.launch()
+# Load models and run a dummy analysis while the UI comes up
+warm_up_in_background()
+
+# Run several analyses at once; their CREPE frames share batches
+demo.queue(default_concurrency_limit=Config.JOB_WORKERS)
+
+# The UI is mounted next to a readiness endpoint, so a cold-starting
+# Space reports its warm-up progress (same body as the FastAPI app)
+server = FastAPI()
+
+
+@server.get("/healthz")
+def healthz():
+    body = health()
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+
+server = gr.mount_gradio_app(server, demo, path="/")
+uvicorn.run(server, host="0.0.0.0", port=int(os.environ.get("GRADIO_SERVER_PORT", 7860)))
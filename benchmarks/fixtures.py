@@ -0,0 +1,76 @@
+import numpy as np
+from src.config import Config
+
+# C major, MIDI 55-72 (G3-C5): a comfortable untrained vocal range
+_SCALE = [55, 57, 59, 60, 62, 64, 65, 67, 69, 71, 72]
+
+
+def synth_vocal(duration, sr=None, hop=None, tempo=96.0, seed=0,
+                vibrato_hz=5.5, vibrato_cents=30, noise=0.003):
+    """
+    Deterministic synthetic singing: phrases of 8 notes on a beat grid,
+    each 1-2 beats long with vibrato and a short attack/release, followed
+    by a 2-beat rest.
+
+    Returns (y, truth) where truth holds the frame-level reference f0
+    (NaN when silent), the note list, beat times and tempo.
+    """
+    sr = sr or Config.SAMPLE_RATE
+    hop = hop or Config.HOP_LENGTH
+    rng = np.random.default_rng(seed)
+    beat = 60.0 / tempo
+
+    notes = []
+    t = 0.0
+    idx = 5
+    while t < duration:
+        for _ in range(8):
+            length = beat * rng.choice([1, 2])
+            if t + length > duration:
+                break
+            idx = int(np.clip(idx + rng.integers(-2, 3), 0, len(_SCALE) - 1))
+            notes.append((t, t + length * 0.95, _SCALE[idx]))
+            t += length
+        t += 2 * beat
+    notes = [n for n in notes if n[1] <= duration]
+
+    n = int(duration * sr)
+    f_inst = np.zeros(n)
+    env = np.zeros(n)
+    for start, end, midi in notes:
+        a, b = int(start * sr), int(end * sr)
+        ts = np.arange(b - a) / sr
+        f = 440.0 * 2 ** ((midi - 69) / 12)
+        f_inst[a:b] = f * 2 ** (vibrato_cents / 1200 * np.sin(2 * np.pi * vibrato_hz * ts))
+        attack = np.minimum(ts / 0.02, 1)
+        release = np.minimum((end - start - ts) / 0.03, 1)
+        env[a:b] = np.minimum(attack, release)
+
+    phase = 2 * np.pi * np.cumsum(f_inst) / sr
+    y = sum(amp * np.sin(h * phase) for h, amp in enumerate((1.0, 0.5, 0.3, 0.2), start=1))
+    y = 0.3 * env * y / 2.0 + noise * rng.standard_normal(n)
+
+    # Reference f0 at frame centers
+    centers = np.arange(1 + n // hop) * hop
+    f0 = np.where(env[np.minimum(centers, n - 1)] > 0, f_inst[np.minimum(centers, n - 1)], np.nan)
+    f0[f0 <= 0] = np.nan
+
+    truth = {
+        "times": centers / sr,
+        "f0": f0,
+        "notes": notes,
+        "beats": np.arange(0, duration, beat),
+        "tempo": tempo,
+    }
+    return y.astype(np.float32), truth
+
+
+def degrade_pitch(f0, seed=0, jitter_cents=15, dropout=0.05):
+    """
+    Reference f0 with pitch jitter and short dropouts, used as a fixed
+    input for the post-processing stages.
+    """
+    rng = np.random.default_rng(seed)
+    out = f0 * 2 ** (rng.normal(0, jitter_cents, len(f0)) / 1200)
+    out[rng.random(len(f0)) < dropout] = np.nan
+    return out
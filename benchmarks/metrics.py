@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def pitch_accuracy(est, ref, tol_cents=50):
+    """
+    Raw pitch accuracy over reference-voiced frames plus voicing recall
+    and false-alarm rate.
+    """
+    n = min(len(est), len(ref))
+    est, ref = est[:n], ref[:n]
+    ref_v, est_v = ~np.isnan(ref), ~np.isnan(est)
+
+    both = ref_v & est_v
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cents = np.abs(1200 * np.log2(est[both] / ref[both]))
+
+    return {
+        "raw_pitch_accuracy": float(np.sum(cents <= tol_cents) / max(ref_v.sum(), 1)),
+        "voicing_recall": float(both.sum() / max(ref_v.sum(), 1)),
+        "voicing_false_alarm": float((est_v & ~ref_v).sum() / max((~ref_v).sum(), 1)),
+    }
+
+
+def note_f_measure(est_notes, ref_notes, onset_tol=0.1):
+    """
+    Greedy one-to-one matching on onset (within onset_tol) and MIDI number.
+    """
+    unmatched = list(ref_notes)
+    hits = 0
+    for note in est_notes:
+        for ref in unmatched:
+            if abs(note["start"] - ref[0]) <= onset_tol and note["midi"] == ref[2]:
+                unmatched.remove(ref)
+                hits += 1
+                break
+    precision = hits / max(len(est_notes), 1)
+    recall = hits / max(len(ref_notes), 1)
+    f = 2 * precision * recall / max(precision + recall, 1e-9)
+    return {"note_precision": precision, "note_recall": recall, "note_f": f}
+
+
+def beat_f_measure(est, ref, tol=0.07):
+    est, ref = np.asarray(est), np.asarray(ref)
+    if not len(est) or not len(ref):
+        return {"beat_f": 0.0}
+    d = np.abs(est[:, None] - ref[None, :])
+    hits = min(np.sum(d.min(axis=1) <= tol), np.sum(d.min(axis=0) <= tol))
+    precision, recall = hits / len(est), hits / len(ref)
+    return {"beat_f": float(2 * precision * recall / max(precision + recall, 1e-9))}
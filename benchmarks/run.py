@@ -0,0 +1,160 @@
+"""
+Time and score every pipeline function on synthetic singing.
+
+    python -m benchmarks.run                              # 10 s .. 30 min
+    python -m benchmarks.run --durations 10 60 -o new.json --baseline old.json
+
+Each function is timed on its own (best of --repeat runs) with fixed,
+seeded inputs, and its output is scored against the fixture's ground
+truth. Results are saved as JSON so runs can be compared with
+--baseline.
+"""
+import argparse, json, os, platform, subprocess, tempfile, time
+import numpy as np
+from src.config import Config
+from benchmarks.fixtures import synth_vocal, degrade_pitch
+from benchmarks.metrics import pitch_accuracy, note_f_measure, beat_f_measure
+
+DURATIONS = (10, 60, 300, 1800)
+
+
+def _best_of(fn, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_duration(duration, repeat=3, seed=0):
+    sr, hop = Config.SAMPLE_RATE, Config.HOP_LENGTH
+    y, truth = synth_vocal(duration, sr, hop, seed=seed)
+    times = truth["times"]
+    results = {}
+
+    def run(name, fn, score=None, repeat=repeat):
+        try:
+            seconds, out = _best_of(fn, repeat)
+        except ImportError as e:
+            results[name] = {"skipped": str(e)}
+            print(f"  {name:26s} skipped ({e})")
+            return None
+        results[name] = {"seconds": seconds, "accuracy": score(out) if score else {}}
+        acc = " ".join(f"{k}={v:.3f}" for k, v in results[name]["accuracy"].items())
+        print(f"  {name:26s} {seconds:8.3f}s  {acc}")
+        return out
+
+    # Model stages run once; they dominate and are deterministic
+    def pitch():
+        from src.pitch import extract_pitch_vocal
+        return extract_pitch_vocal(y, sr)
+
+    run("extract_pitch_vocal", pitch,
+        lambda p: pitch_accuracy(p.f0, truth["f0"]), repeat=1)
+
+    def beats():
+        from src.rhythm import detect_beats
+        return detect_beats(y, sr, hop)
+
+    run("detect_beats", beats,
+        lambda r: dict(beat_f_measure(r[1], truth["beats"]),
+                       tempo_error=abs(r[0] - truth["tempo"])), repeat=1)
+
+    # Post-processing stages get the same degraded reference every run
+    f0_in = degrade_pitch(truth["f0"], seed=seed)
+
+    from src.postprocess import bridge_short_gaps, enforce_beatwise_pitch
+    bridged = run("bridge_short_gaps",
+                  lambda: bridge_short_gaps(f0_in, max_gap_frames=Config.MAX_GAP_FRAMES),
+                  lambda f: pitch_accuracy(f, truth["f0"]))
+
+    snapped = run("enforce_beatwise_pitch",
+                  lambda: enforce_beatwise_pitch(times, bridged, truth["beats"],
+                                                 max_flat_cents=Config.MAX_FLAT_CENTS),
+                  lambda f: pitch_accuracy(f, truth["f0"]))
+
+    from src.notes import segment_notes_from_pitch
+    from src.pitch_track import PitchTrack
+    track = PitchTrack(snapped, np.ones(len(snapped)), sr, hop)
+    run("segment_notes_from_pitch",
+        lambda: segment_notes_from_pitch(track),
+        lambda notes: note_f_measure(notes, truth["notes"]))
+
+    from src.synthesis import resynthesize_f0
+    run("resynthesize_f0", lambda: resynthesize_f0(snapped, sr, hop))
+
+    def plot():
+        from src.visualization import plot_pitch
+        with tempfile.TemporaryDirectory() as tmp:
+            plot_pitch(times, snapped, truth["beats"], os.path.join(tmp, "pitch.png"))
+
+    run("plot_pitch", plot)
+
+    return results
+
+
+def compare(current, baseline):
+    print("\nChange vs baseline (time ratio, accuracy delta):")
+    for duration, funcs in current["results"].items():
+        base = baseline["results"].get(duration, {})
+        for name, r in funcs.items():
+            b = base.get(name)
+            if not b or "seconds" not in b or "seconds" not in r:
+                continue
+            ratio = r["seconds"] / max(b["seconds"], 1e-9)
+            deltas = " ".join(
+                f"{k}{v - b['accuracy'][k]:+.3f}"
+                for k, v in r["accuracy"].items() if k in b["accuracy"]
+            )
+            print(f"  {duration:>6s}s {name:26s} x{ratio:6.2f}  {deltas}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks")
+    parser.add_argument("--durations", type=float, nargs="+", default=DURATIONS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None)
+    parser.add_argument("--baseline", default=None)
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "sample_rate": Config.SAMPLE_RATE,
+            "hop_length": Config.HOP_LENGTH,
+        },
+        "results": {},
+    }
+
+    for duration in args.durations:
+        print(f"{duration:g}s fixture")
+        report["results"][f"{duration:g}"] = bench_duration(duration, args.repeat, args.seed)
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"{report['meta']['commit'] or 'local'}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
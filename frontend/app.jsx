@@ -1,12 +1,93 @@
-import React, { useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { createRoot } from "react-dom/client";
 
+/* ===============================
+   PITCH CONTOUR (CANVAS)
+   Draws result.contour: per-bucket min/max Hz on a log axis,
+   beat lines, note boxes and (if present) the loudness level.
+=============================== */
+function PitchContour({ contour, height = 320 }) {
+  const canvasRef = useRef(null);
+
+  useEffect(() => {
+    const canvas = canvasRef.current;
+    if (!canvas || !contour) return;
+
+    const width = canvas.clientWidth;
+    const dpr = window.devicePixelRatio || 1;
+    canvas.width = width * dpr;
+    canvas.height = height * dpr;
+
+    const ctx = canvas.getContext("2d");
+    ctx.scale(dpr, dpr);
+    ctx.clearRect(0, 0, width, height);
+
+    const hz = contour.max.filter((v) => v !== null)
+      .concat(contour.min.filter((v) => v !== null));
+    if (!hz.length || !contour.duration) return;
+
+    const lo = Math.log2(Math.min(...hz) / 1.1);
+    const hi = Math.log2(Math.max(...hz) * 1.1);
+    const x = (t) => (t / contour.duration) * width;
+    const y = (f) => height - ((Math.log2(f) - lo) / (hi - lo)) * height;
+    const midiHz = (m) => 440 * Math.pow(2, (m - 69) / 12);
+
+    // Loudness (normalized RMS), drawn along the bottom
+    if (contour.level) {
+      ctx.fillStyle = "rgba(31, 119, 180, 0.12)";
+      ctx.beginPath();
+      ctx.moveTo(0, height);
+      for (let i = 0; i < contour.t.length; i++) {
+        ctx.lineTo(x(contour.t[i]), height - (contour.level[i] || 0) * height * 0.25);
+      }
+      ctx.lineTo(width, height);
+      ctx.fill();
+    }
+
+    // Beats
+    ctx.strokeStyle = "rgba(128, 128, 128, 0.3)";
+    ctx.beginPath();
+    for (const b of contour.beats) {
+      ctx.moveTo(x(b), 0);
+      ctx.lineTo(x(b), height);
+    }
+    ctx.stroke();
+
+    // Notes
+    ctx.fillStyle = "rgba(255, 140, 0, 0.35)";
+    const { start, end, midi } = contour.notes;
+    for (let i = 0; i < start.length; i++) {
+      const f = midiHz(midi[i]);
+      ctx.fillRect(x(start[i]), y(f * 1.03), x(end[i]) - x(start[i]), y(f / 1.03) - y(f * 1.03));
+    }
+
+    // Contour: one vertical segment per bucket (min to max)
+    ctx.strokeStyle = "#1f77b4";
+    ctx.beginPath();
+    for (let i = 0; i < contour.t.length; i++) {
+      if (contour.min[i] === null) continue;
+      const px = x(contour.t[i]);
+      ctx.moveTo(px, y(contour.max[i]));
+      ctx.lineTo(px, y(contour.min[i]) + 1);
+    }
+    ctx.stroke();
+  }, [contour, height]);
+
+  return (
+    <canvas
+      ref={canvasRef}
+      style={{ width: "100%", height: `${height}px`, marginBottom: "16px" }}
+    />
+  );
+}
+
 function App() {
   /* ===============================
      STATE (TOP OF COMPONENT)
   =============================== */
   const [loading, setLoading] = useState(false);
   const [result, setResult] = useState(null);
+  const [progress, setProgress] = useState(null);
 
   /* ===============================
      EVENT HANDLER (LOGIC)
@@ -15,26 +96,46 @@ function App() {
     const file = e.target.files[0];
     if (!file) return;
 
-    const formData = new FormData();
-    formData.append("file", file);
-
     setLoading(true);
     setResult(null);
 
     try {
-      const res = await fetch("/analyze", {
+      // Raw body: the server writes it to disk as it arrives
+      const res = await fetch(`/analyze/raw?filename=${encodeURIComponent(file.name)}`, {
         method: "POST",
-        body: formData
+        headers: { "Content-Type": "application/octet-stream" },
+        body: file
       });
 
+      if (res.status === 429) throw new Error("Server is busy, try again shortly");
       if (!res.ok) throw new Error("Analysis failed");
 
-      const data = await res.json();
-      setResult(data);
+      const { job_id } = await res.json();
+      setResult(await waitForJob(job_id));
     } catch (err) {
       alert(err.message);
     } finally {
       setLoading(false);
+      setProgress(null);
+    }
+  };
+
+  /* ===============================
+     JOB POLLING
+  =============================== */
+  const waitForJob = async (jobId) => {
+    while (true) {
+      const res = await fetch(`/jobs/${jobId}`);
+      if (!res.ok) throw new Error("Analysis failed");
+
+      const job = await res.json();
+      if (job.status === "done") return job.result;
+      if (job.status === "failed" || job.status === "cancelled") {
+        throw new Error(job.error || "Analysis failed");
+      }
+
+      setProgress(job);
+      await new Promise((r) => setTimeout(r, 1000));
     }
   };
 
@@ -53,7 +154,13 @@ function App() {
       />
 
       {/* Loading */}
-      {loading && <p>Analyzing audio… 🎧</p>}
+      {loading && (
+        <p>
+          Analyzing audio… 🎧
+          {progress && progress.stage &&
+            ` (${progress.stage} ${progress.step}/${progress.total})`}
+        </p>
+      )}
 
       {/* Results */}
       {result && (
@@ -61,11 +168,14 @@ function App() {
           <h2>Analysis Result</h2>
 
           {/* Pitch Plot */}
-          <img
-            src={`/file?path=${result.pitch_plot}`}
-            alt="Pitch plot"
-            style={{ width: "100%", marginBottom: "16px" }}
-          />
+          {result.contour && <PitchContour contour={result.contour} />}
+          {result.pitch_plot && (
+            <img
+              src={`/file?path=${result.pitch_plot}`}
+              alt="Pitch plot"
+              style={{ width: "100%", marginBottom: "16px" }}
+            />
+          )}
 
           {/* Resynth Audio */}
           <audio controls>
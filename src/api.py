@@ -1,15 +1,38 @@
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import FileResponse, HTMLResponse
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+from fastapi import FastAPI, UploadFile, File, Body, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-import shutil, os, uuid
+import asyncio, json, shutil, os, uuid
 
-from main import main
+from src.config import Config
+from src.jobs import JobManager, QueueFull
+from src.metrics import metrics
+from src.crepe_backend import server_stats
+from src.result_io import MEDIA_TYPE
+from src.scoring import ReferenceIndex, score_takes
+from src.streaming import StreamingPitchTracker
+from src.warmup import state as warmup_state
+import numpy as np
 
-app = FastAPI()
+jobs = None
+references = ReferenceIndex()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global jobs
+    jobs = JobManager()
+    yield
+    jobs.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 BASE_DIR = os.path.dirname(__file__)
 UPLOAD_DIR = "uploads"
-OUTPUT_DIR = "outputs"
+OUTPUT_DIR = Config.JOB_OUTPUT_DIR
 DIST_DIR = "dist"
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -25,17 +48,224 @@ def index():
         return f.read()
 
 
-@app.post("/analyze")
-async def analyze_audio(file: UploadFile = File(...)):
+def _save_upload(file):
     uid = uuid.uuid4().hex
-    path = f"{UPLOAD_DIR}/{uid}_{file.filename}"
+    path = f"{UPLOAD_DIR}/{uid}_{os.path.basename(file.filename)}"
 
     with open(path, "wb") as f:
         shutil.copyfileobj(file.file, f)
+    return path
+
+
+def _submit(path, png, separation):
+    try:
+        job_id = jobs.submit(path, remove_input=True, render_png=png, separation=separation)
+    except QueueFull:
+        os.remove(path)
+        raise HTTPException(
+            status_code=429,
+            detail="Analysis queue is full, try again shortly",
+            headers={"Retry-After": "10"}
+        )
+
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.post("/analyze", status_code=202)
+async def analyze_audio(
+    file: UploadFile = File(...),
+    png: bool = False,
+    separation: Optional[Literal["auto", "always", "never"]] = None
+):
+    """
+    png=true additionally renders the server-side matplotlib plot; by
+    default the client draws result["contour"].
+
+    separation=always|never forces or disables Demucs for this upload;
+    "auto" (the default) decides with a quick pre-check.
+    """
+    path = await run_in_threadpool(_save_upload, file)
+    return _submit(path, png, separation)
+
+
+@app.post("/analyze/raw", status_code=202)
+async def analyze_raw(
+    request: Request,
+    filename: str,
+    png: bool = False,
+    separation: Optional[Literal["auto", "always", "never"]] = None
+):
+    """
+    Same as /analyze, but the request body is the audio file itself.
+    The body is written to uploads/ as it arrives instead of being
+    spooled by the multipart parser and copied again. The filename's
+    extension tells the decoder the container.
+    """
+    path = f"{UPLOAD_DIR}/{uuid.uuid4().hex}_{os.path.basename(filename)}"
+
+    with open(path, "wb") as f:
+        async for chunk in request.stream():
+            await run_in_threadpool(f.write, chunk)
+    if os.path.getsize(path) == 0:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail="Empty upload")
+
+    return _submit(path, png, separation)
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+def _finished_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}")
+    return job
+
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str, request: Request):
+    """
+    The finished analysis, as JSON or, when the client sends
+    Accept: application/vnd.voicecoach.result, as the binary .vcr file
+    (load with src.result_io.loads / read_result).
+    """
+    job = _finished_job(job_id)
+    headers = {"Vary": "Accept"}
+    if MEDIA_TYPE in request.headers.get("accept", ""):
+        return FileResponse(job["result"]["result_path"], media_type=MEDIA_TYPE, headers=headers)
+    return JSONResponse(job["result"], headers=headers)
+
+
+@app.get("/references")
+def list_references():
+    return {"references": references.names()}
+
+
+@app.post("/references/{name}")
+def add_reference(name: str, job_id: str):
+    """
+    Store a finished analysis as reference `name`.
+    """
+    job = _finished_job(job_id)
+    try:
+        references.add(name, job["result"]["result_path"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"reference": name}
+
+
+@app.post("/references/{name}/score")
+async def score_against_reference(name: str, job_ids: list[str] = Body(..., embed=True)):
+    """
+    Score finished analyses (e.g. a class's takes) against reference
+    `name`, all in one batch.
+    """
+    try:
+        ref = await run_in_threadpool(references.get, name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown reference")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    paths = [_finished_job(job_id)["result"]["result_path"] for job_id in job_ids]
+    try:
+        scores = await run_in_threadpool(score_takes, ref, paths)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"reference": name, "scores": dict(zip(job_ids, scores))}
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+
+    async def stream():
+        last = None
+        while True:
+            job = jobs.get(job_id)
+            if job is None:
+                return
+            state = (job["status"], job["step"])
+            if state != last:
+                last = state
+                yield f"data: {json.dumps(job)}\n\n"
+            if job["status"] not in ("queued", "running"):
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.get("/healthz")
+def healthz():
+    """
+    Readiness: 200 once every worker has loaded its models and run a
+    dummy analysis, 503 before that.
+    """
+    ready = jobs is not None and jobs.ready()
+    body = {
+        "status": "ready" if ready else "warming_up",
+        "workers": jobs.workers if jobs else 0,
+        "error": jobs.warmup_error() if jobs else None,
+        "warmup": dict(warmup_state),
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    metrics.set_gauge("voicecoach_jobs_queued", jobs.queue_depth(), "Jobs waiting for a worker")
+    metrics.set_gauge("voicecoach_jobs_running", jobs.running(), "Jobs being analyzed")
+
+    # CREPE batching server of this process (live streams, and jobs
+    # unless JOB_EXECUTOR = "process")
+    crepe = server_stats()
+    metrics.set_gauge("voicecoach_crepe_queue_frames", crepe["queued_frames"], "Frames waiting for a CREPE batch")
+    metrics.set_counter("voicecoach_crepe_batches_total", crepe["batches"], "CREPE batches run")
+    metrics.set_gauge("voicecoach_crepe_batch_frames_mean", f"{crepe['mean_batch']:.1f}", "Mean frames per CREPE batch")
+    return metrics.render()
+
 
-    result = main(path)
+@app.websocket("/ws/pitch")
+async def pitch_stream(ws: WebSocket, sr: int = Config.SAMPLE_RATE):
+    """
+    Live pitch tracking. The client sends binary frames of mono float32
+    PCM at `sr` (blocks of ~512-1024 samples keep latency under 100 ms)
+    and receives {"events": [...]} after each block. Bad input gets an
+    {"error": ...} frame; an unsupported `sr` also closes the socket.
+    """
+    await ws.accept()
+    lo, hi = Config.STREAM_SR_RANGE
+    if not lo <= sr <= hi:
+        await ws.send_json({"error": f"sr must be between {lo} and {hi} Hz"})
+        await ws.close(code=1008)
+        return
+    tracker = StreamingPitchTracker(sr=sr)
 
-    return result
+    try:
+        while True:
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if data is None or len(data) % 4:
+                await ws.send_json({"error": "expected binary frames of float32 samples"})
+                continue
+            block = np.frombuffer(data, dtype=np.float32)
+            events = await run_in_threadpool(tracker.push, block)
+            if events:
+                await ws.send_json({"events": events})
+    except WebSocketDisconnect:
+        pass
 
 
 @app.get("/file")
@@ -1,6 +1,58 @@
-import librosa
+import os
+from src.config import Config
 
-def load_audio(path, sr):
-    y, sr = librosa.load(path, sr=sr)
-    print(f"Loaded {path} ({len(y)/sr:.2f}s)")
+def load_audio(path, sr, mono=True):
+    from src.ingest import ingest
+
+    y = ingest(path, (sr,), mono=mono)[sr]
+    print(f"Loaded {path} ({y.shape[-1]/sr:.2f}s)")
+    return y, sr
+
+
+def load_excerpt(path, sr, offset, duration):
+    """
+    Mono excerpt of `duration` seconds starting at `offset`.
+    """
+    from src.ingest import ingest
+
+    return ingest(path, (sr,), mono=True, offset=offset, duration=duration)[sr], sr
+
+
+# libsndfile's MP3 decoder returns garbage for up to a few hundred ms
+# after a seek or a partial read (the bit reservoir isn't primed), so
+# MPEG reads start this much earlier and drop the excess
+MPEG_PREROLL_SECONDS = 1.0
+
+
+def read_frames(f, start, frames=-1):
+    """
+    `frames` samples (-1: to the end) from sample `start` of an open
+    soundfile.SoundFile, as float32 (channels, samples).
+    """
+    pre = 0
+    if f.subtype.startswith("MPEG") and start > 0:
+        pre = min(start, int(MPEG_PREROLL_SECONDS * f.samplerate))
+    f.seek(start - pre)
+    y = f.read(frames if frames < 0 else frames + pre, dtype="float32", always_2d=True)
+    return y[pre:].T
+
+
+def resample_audio(y, orig_sr, sr):
+    if orig_sr != sr:
+        import librosa
+        y = librosa.resample(y, orig_sr=orig_sr, target_sr=sr)
     return y, sr
+
+
+def write_debug_audio(name, y, sr, workdir="outputs"):
+    """
+    Dump an intermediate buffer to disk when Config.DEBUG_WRITE_AUDIO is set.
+    """
+    if not Config.DEBUG_WRITE_AUDIO:
+        return None
+    import soundfile as sf
+
+    os.makedirs(workdir, exist_ok=True)
+    path = os.path.join(workdir, name)
+    sf.write(path, y.T, sr)
+    return path
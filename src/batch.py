@@ -0,0 +1,139 @@
+"""
+Batch analysis of a folder or manifest of recordings.
+
+    python -m src.batch submissions/ -o results.jsonl --workers 4
+    python -m src.batch manifest.txt -o results.parquet --resume
+
+A manifest is a text file with one path per line, or JSONL with a
+"path" field. Results are appended one record per file as they finish,
+so an interrupted run can be continued with --resume.
+"""
+import argparse, hashlib, json, multiprocessing, os, sys, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.config import Config
+from src.warmup import warm_models
+
+AUDIO_EXTS = (".wav", ".mp3", ".flac", ".ogg", ".m4a", ".aac", ".aiff")
+
+
+def collect_inputs(source):
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths += [os.path.join(root, f) for f in files
+                      if f.lower().endswith(AUDIO_EXTS)]
+        return sorted(paths)
+
+    base = os.path.dirname(source)
+    paths = []
+    with open(source, encoding="utf8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = json.loads(line)["path"] if line.startswith("{") else line
+            paths.append(path if os.path.isabs(path) else os.path.join(base, path))
+    return paths
+
+
+def _read_records(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _analyze(path, outdir, separation=None):
+    start = time.time()
+    run_dir = os.path.join(outdir, hashlib.sha1(path.encode()).hexdigest()[:12])
+    try:
+        from src.main import main
+        result = main(path, outdir=run_dir, separation=separation)
+        return dict(result, path=path, status="ok", seconds=time.time() - start)
+    except Exception as e:
+        return {"path": path, "status": "error", "error": repr(e),
+                "seconds": time.time() - start}
+
+
+def _parquet_rows(records):
+    """
+    Records with the union of all keys (missing ones None), nested values
+    (notes, contour, timings, ...) as JSON strings. Arrow infers a table's
+    schema from the first row, so ok and error records must agree.
+    """
+    keys = list(dict.fromkeys(k for r in records for k in r))
+    return [
+        {k: json.dumps(r[k]) if isinstance(r.get(k), (dict, list)) else r.get(k)
+         for k in keys}
+        for r in records
+    ]
+
+
+def _write_parquet(records, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("Parquet output needs pyarrow (pip install pyarrow)")
+    pq.write_table(pa.Table.from_pylist(_parquet_rows(records)), path)
+
+
+def run_batch(source, output, workers=None, resume=False, outdir=None,
+              separation=None):
+    paths = collect_inputs(source)
+    parquet = output.endswith(".parquet")
+    log_path = output + ".partial.jsonl" if parquet else output
+    outdir = outdir or os.path.join(Config.JOB_OUTPUT_DIR, "batch")
+
+    if not resume and os.path.exists(log_path):
+        os.remove(log_path)
+    done = {r["path"] for r in _read_records(log_path) if r.get("status") == "ok"}
+    todo = [p for p in paths if p not in done]
+    print(f"{len(paths)} files, {len(done)} already done, {len(todo)} to analyze")
+
+    workers = workers or Config.JOB_WORKERS
+    start = time.time()
+    finished = 0
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=warm_models) as pool, \
+            open(log_path, "a", encoding="utf8") as log:
+        futures = [pool.submit(_analyze, p, outdir, separation) for p in todo]
+        for future in as_completed(futures):
+            record = future.result()
+            log.write(json.dumps(record) + "\n")
+            log.flush()
+
+            finished += 1
+            rate = finished / (time.time() - start) * 60
+            print(f"[{finished}/{len(todo)}] {record['status']:5s} "
+                  f"{record['path']} ({rate:.1f} files/min)")
+
+    elapsed = time.time() - start
+    if finished:
+        print(f"Analyzed {finished} files in {elapsed:.0f}s "
+              f"({finished / elapsed * 60:.1f} files/min)")
+
+    if parquet:
+        # Keep the latest record per file (retries replace earlier errors)
+        records = {r["path"]: r for r in _read_records(log_path)}
+        _write_parquet(list(records.values()), output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze many recordings")
+    parser.add_argument("source", help="folder of recordings or manifest file")
+    parser.add_argument("-o", "--output", default="results.jsonl",
+                        help=".jsonl or .parquet")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--resume", action="store_true",
+                        help="skip files already recorded as ok")
+    parser.add_argument("--outdir", default=None,
+                        help="where per-file resynth/plot outputs go")
+    parser.add_argument("--separation", choices=("auto", "always", "never"),
+                        default=None, help="vocal separation (default: Config)")
+    args = parser.parse_args()
+
+    run_batch(args.source, args.output, args.workers, args.resume, args.outdir,
+              args.separation)
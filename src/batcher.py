@@ -0,0 +1,99 @@
+import queue, threading, time
+from concurrent.futures import Future
+import numpy as np
+
+
+class DynamicBatcher:
+    """
+    In-process inference server that coalesces concurrent requests.
+
+    Callers submit arrays of rows; a single server thread gathers queued
+    requests until `max_batch` rows are waiting or the oldest has waited
+    `max_wait` seconds, runs `predict_fn` once on the concatenation and
+    hands each caller its slice of the output through a Future.
+    """
+
+    def __init__(self, predict_fn, max_batch, max_wait):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._queued_rows = 0
+        self._batches = 0
+        self._rows = 0
+        self._last_batch = 0
+
+    def submit(self, rows):
+        """
+        Queue rows (n, ...) for inference; returns a Future of the
+        (n, ...) output.
+        """
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._serve, daemon=True)
+                self._thread.start()
+            self._queued_rows += len(rows)
+        self._queue.put((rows, future))
+        return future
+
+    def __call__(self, rows):
+        return self.submit(rows).result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued_rows": self._queued_rows,
+                "batches": self._batches,
+                "rows": self._rows,
+                "mean_batch": self._rows / self._batches if self._batches else 0.0,
+                "last_batch": self._last_batch,
+            }
+
+    def _collect(self, first):
+        """
+        The next batch: `first` plus whatever arrives before the batch is
+        full or the wait runs out. A request that would overflow the
+        batch is returned separately to start the next one.
+        """
+        batch, size = [first], len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if size + len(item[0]) > self.max_batch:
+                return batch, item
+            batch.append(item)
+            size += len(item[0])
+        return batch, None
+
+    def _serve(self):
+        carry = None
+        while True:
+            first = carry or self._queue.get()
+            batch, carry = self._collect(first)
+            sizes = [len(rows) for rows, _ in batch]
+
+            with self._lock:
+                self._queued_rows -= sum(sizes)
+                self._batches += 1
+                self._rows += sum(sizes)
+                self._last_batch = sum(sizes)
+
+            try:
+                out = self.predict_fn(np.concatenate([rows for rows, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), part in zip(batch, np.split(out, np.cumsum(sizes)[:-1])):
+                future.set_result(part)
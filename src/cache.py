@@ -0,0 +1,135 @@
+import hashlib, os, pickle, tempfile, threading
+from src.config import Config
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def stage_key(parents, stage, **params):
+    """
+    Derive a stage key from its upstream keys and the Config values it uses,
+    so changing a late parameter leaves earlier stages cached.
+    """
+    if isinstance(parents, str):
+        parents = [parents]
+    h = hashlib.sha256()
+    for p in parents:
+        h.update(p.encode())
+    h.update(stage.encode())
+    h.update(repr(sorted(params.items())).encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Size-bounded on-disk LRU cache of pickled stage outputs.
+
+    put() keeps a running size total and only scans the directory when it
+    crosses max_bytes; eviction then trims to EVICT_TO * max_bytes so the
+    next scan is some puts away. Writes by other processes sharing the
+    directory are counted at that scan.
+    """
+
+    EVICT_TO = 0.9
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = root or Config.CACHE_DIR
+        self.max_bytes = max_bytes or Config.CACHE_MAX_BYTES
+        self._lock = threading.Lock()
+        self._size = None   # bytes on disk, from the last scan plus puts since
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".pkl")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        with self._lock:
+            try:
+                size -= os.stat(path).st_size
+            except FileNotFoundError:
+                pass
+            os.replace(tmp, path)
+            if self._size is not None:
+                self._size += size
+        if self._size is None or self._size > self.max_bytes:
+            self._evict()
+
+    def get_or_compute(self, key, fn):
+        value = self.get(key)
+        if value is None:
+            value = fn()
+            self.put(key, value)
+        return value
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for root, _, files in os.walk(self.root):
+                for name in files:
+                    if not name.endswith(".pkl"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+
+            if total > self.max_bytes:
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.EVICT_TO * self.max_bytes:
+                        break
+                    try:
+                        os.remove(path)
+                        total -= size
+                    except FileNotFoundError:
+                        pass
+            self._size = total
+
+
+class NullCache:
+    def get(self, key):
+        return None
+
+    def put(self, key, value):
+        pass
+
+    def get_or_compute(self, key, fn):
+        return fn()
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = ResultCache() if Config.CACHE_ENABLED else NullCache()
+    return _cache
@@ -0,0 +1,114 @@
+import numpy as np
+import soundfile as sf
+from src.config import Config
+from src.audio_io import read_frames, resample_audio
+from src.separation import separate
+from src.pitch import extract_pitch_vocal
+from src.pitch_track import PitchTrack
+from src.rhythm import detect_beats
+from src.features import FeatureStore
+
+
+def audio_duration(path):
+    """
+    Duration in seconds, or None if soundfile can't read the container.
+    """
+    try:
+        return sf.info(path).duration
+    except RuntimeError:
+        return None
+
+
+def use_chunked(path):
+    if not Config.CHUNK_SECONDS:
+        return False
+    duration = audio_duration(path)
+    return duration is not None and duration > Config.CHUNK_THRESHOLD_SECONDS
+
+
+def iter_windows(path, sr, hop, window_s, overlap_s):
+    """
+    Read fixed-length overlapping windows from disk one at a time.
+
+    Windows start on multiples of `hop` at the analysis rate `sr`, so
+    their frames line up with the global frame grid. Yields
+    (start_frame, keep_from, keep_to, audio, native_sr), where
+    [keep_from, keep_to) are the window's local frames that it owns.
+    """
+    step = int(round((window_s - overlap_s) * sr / hop))
+    half = int(round(overlap_s * sr / hop)) // 2
+    length = step + 2 * half
+
+    with sf.SoundFile(path) as f:
+        native_sr = f.samplerate
+        total = int(np.ceil(f.frames / native_sr * sr / hop))
+
+        for start in range(-half, total, step):
+            first = max(start, 0)
+            a = int(round(first * hop / sr * native_sr))
+            b = int(round((start + length) * hop / sr * native_sr))
+            audio = read_frames(f, a, b - a)
+
+            keep_from = max(start + half, 0) - first
+            keep_to = min(start + half + step, total) - first
+            yield first, keep_from, keep_to, audio, native_sr
+
+
+def analyze_chunked(path, stage, use_separation=True):
+    """
+    Separation, rhythm and pitch over overlapping windows with bounded
+    memory. Only each window's owned frames are kept, so edge effects of
+    smoothing, resampling and beat tracking fall in the discarded overlap.
+
+    stage: main()'s stage context manager; timings add up over windows.
+
+    use_separation: False skips Demucs (input is already a vocal).
+
+    Note: the RMS gate is normalised per window rather than globally.
+    """
+    sr, hop = Config.SAMPLE_RATE, Config.HOP_LENGTH
+    pitch_parts = []
+    beats, tempos = [], []
+
+    for first, keep_from, keep_to, audio, native_sr in iter_windows(
+        path, sr, hop, Config.CHUNK_SECONDS, Config.CHUNK_OVERLAP_SECONDS
+    ):
+        if keep_to <= keep_from:
+            break
+
+        if use_separation:
+            with stage("separation"):
+                mix, mix_sr = resample_audio(audio, native_sr, Config.SEPARATION_SR)
+                del audio
+                vocal, vocal_sr = separate(mix, mix_sr)
+                del mix
+        else:
+            vocal, vocal_sr = audio.mean(axis=0), native_sr
+            del audio
+
+        with stage("load"):
+            y, _ = resample_audio(vocal, vocal_sr, sr)
+            del vocal
+
+        features = FeatureStore(y, sr, consumers=("rhythm", "pitch"))
+        with stage("rhythm"):
+            tempo, beat_times = detect_beats(y, sr, hop, features)
+            features.release("rhythm")
+        t0 = first * hop / sr
+        lo, hi = keep_from * hop / sr, keep_to * hop / sr
+        beats.append(t0 + beat_times[(beat_times >= lo) & (beat_times < hi)])
+        tempos.append((tempo, keep_to - keep_from))
+
+        with stage("pitch"):
+            pitch = extract_pitch_vocal(y, sr, features)
+            features.release("pitch")
+        pitch_parts.append(pitch[keep_from:keep_to])
+        del y, pitch
+
+    pitch = PitchTrack.concatenate(pitch_parts)
+
+    # Frame-weighted median tempo across windows
+    tempo_vals = np.repeat([t for t, _ in tempos], [w for _, w in tempos])
+    tempo = float(np.median(tempo_vals)) if len(tempo_vals) else 0.0
+
+    return tempo, np.concatenate(beats) if beats else np.array([]), pitch
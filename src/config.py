@@ -9,3 +9,85 @@ class Config:
 
     CONF_THRESHOLD = 0.5
     MIN_NOTE_DURATION = 0.25
+
+    # Vocal separation
+    SEPARATION_BACKEND = "inprocess"   # "inprocess" or "subprocess"
+    SEPARATION_MODEL = "htdemucs"
+    SEPARATION_THREADS = 0             # 0 = torch default
+    SEPARATION_SR = 44100
+    SEPARATION_MODE = "auto"           # "auto" (pre-check), "always", "never"
+    SEPARATION_WORKERS = 0             # forked segment workers; 0 = cores / JOB_WORKERS with the process executor, 1 (no fork) with threads
+    SEPARATION_SEGMENT_SECONDS = 30
+    SEPARATION_OVERLAP_SECONDS = 2     # cross-faded between segments
+    SEPARATION_PARALLEL_MIN_SECONDS = 60
+
+    # Separation pre-check: is the upload already an isolated vocal?
+    VOCAL_CHECK_EXCERPTS = 3      # excerpts spread over the file
+    VOCAL_CHECK_SECONDS = 3       # length of each excerpt
+    VOCAL_CHECK_FLATNESS = 0.02   # spectral flatness above this suggests a mix
+    VOCAL_CHECK_PERCUSSIVE = 0.25 # percussive share of energy (drums)
+    VOCAL_CHECK_LOW_HZ = 90       # energy below this is bass / kick, not voice
+    VOCAL_CHECK_LOW_SHARE = 0.05
+
+    # Write intermediate buffers (mix, vocal stem) to outputs/ for debugging
+    DEBUG_WRITE_AUDIO = False
+
+    # Post-processing
+    MAX_GAP_FRAMES = 12
+    MAX_FLAT_CENTS = 80
+
+    # Content-addressed result cache
+    CACHE_ENABLED = True
+    CACHE_DIR = ".cache"
+    CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+    # Analysis job queue
+    JOB_WORKERS = 2
+    JOB_MAX_PENDING = 8
+    JOB_TTL = 3600
+    JOB_OUTPUT_DIR = "outputs"
+    JOB_EXECUTOR = "thread"       # jobs share one CREPE server; "process" isolates them
+
+    # Pitch engine
+    PYIN_VETO = True        # False skips pYIN (it only feeds the veto)
+
+    # CREPE inference
+    CREPE_CAPACITY = "medium"
+    CREPE_BATCH_SIZE = 512
+    CREPE_INTRA_OP_THREADS = 0    # 0 = TensorFlow default
+    CREPE_INTER_OP_THREADS = 0
+    CREPE_SKIP_GATED = True       # don't run frames the RMS gate drops
+    RMS_GATE = 0.15
+    CREPE_SERVER = True           # batch frames across concurrent analyses
+    CREPE_SERVER_MAX_BATCH = 1024
+    CREPE_SERVER_MAX_WAIT_MS = 5
+
+    # Streaming pitch tracking
+    STREAM_SMOOTH_FRAMES = 5
+    STREAM_SR_RANGE = (8000, 192000)   # accepted client sample rates for /ws/pitch
+    STREAM_RMS_DECAY = 0.9995     # per-frame decay of the running RMS peak
+
+    # Chunked processing for long recordings (0 disables)
+    CHUNK_SECONDS = 120
+    CHUNK_OVERLAP_SECONDS = 10
+    CHUNK_THRESHOLD_SECONDS = 300
+
+    # Visualization
+    CONTOUR_WIDTH = 1600          # buckets in the contour payload
+    RENDER_PLOT_PNG = False       # server-side matplotlib PNG (opt-in)
+
+    # Reference scoring (multiscale banded DTW)
+    REFERENCE_DIR = "references"
+    SCORE_DECIMATE = 4            # frames merged per pyramid level
+    SCORE_COARSE_FRAMES = 256     # full DTW only below this many frames
+    SCORE_RADIUS = 16             # frames the band extends past the coarse path
+    SCORE_COARSE_RADIUS = 48      # same, at the coarser levels (paths there are less certain)
+    SCORE_MAX_COST = 3.0          # semitones; caps outliers in the DTW cost
+    SCORE_UNVOICED_COST = 1.0     # voiced vs unvoiced frame
+    SCORE_TOLERANCE_CENTS = 50    # a frame / note counts as in tune within this
+    SCORE_OCTAVE_INVARIANT = True
+    SCORE_BATCH = 64              # takes aligned together (bounds step memory)
+
+    # Upload decoding
+    INGEST_QUALITY = "HQ"         # soxr: "VHQ", "HQ", "MQ", "LQ", "QQ" (slower -> faster)
+    INGEST_BLOCK_SECONDS = 10
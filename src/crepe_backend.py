@@ -0,0 +1,172 @@
+import threading
+from collections import deque
+import numpy as np
+from src.config import Config
+from src.batcher import DynamicBatcher
+
+N_BINS = 360
+
+_models = {}
+_servers = {}
+_lock = threading.Lock()
+_threads_configured = False
+
+
+def _configure_threads():
+    """
+    Apply CREPE_INTRA_OP_THREADS / CREPE_INTER_OP_THREADS. TensorFlow only
+    accepts this before its runtime starts, so it runs once before the
+    first model is built.
+    """
+    global _threads_configured
+    if _threads_configured:
+        return
+    _threads_configured = True
+
+    import tensorflow as tf
+    try:
+        if Config.CREPE_INTRA_OP_THREADS:
+            tf.config.threading.set_intra_op_parallelism_threads(Config.CREPE_INTRA_OP_THREADS)
+        if Config.CREPE_INTER_OP_THREADS:
+            tf.config.threading.set_inter_op_parallelism_threads(Config.CREPE_INTER_OP_THREADS)
+    except RuntimeError as e:
+        print("CREPE thread settings ignored, TensorFlow already initialised:", e)
+
+
+def get_model(capacity=None):
+    """
+    Build and load the CREPE model once per process.
+    """
+    capacity = capacity or Config.CREPE_CAPACITY
+    with _lock:
+        if capacity not in _models:
+            _configure_threads()
+            from crepe.core import build_and_load_model
+            _models[capacity] = build_and_load_model(capacity)
+            print(f"Loaded CREPE model '{capacity}'")
+    return _models[capacity]
+
+
+def get_server(capacity=None):
+    """
+    The process-wide DynamicBatcher for a model capacity. Concurrent
+    analyses and live streams in this process share its batches.
+    """
+    capacity = capacity or Config.CREPE_CAPACITY
+    model = get_model(capacity)
+    with _lock:
+        if capacity not in _servers:
+            max_batch = Config.CREPE_SERVER_MAX_BATCH
+            _servers[capacity] = DynamicBatcher(
+                lambda x: model.predict(x, batch_size=max_batch, verbose=0),
+                max_batch=max_batch,
+                max_wait=Config.CREPE_SERVER_MAX_WAIT_MS / 1000
+            )
+    return _servers[capacity]
+
+
+def server_stats():
+    """
+    Batching stats summed over every started server in this process.
+    """
+    with _lock:
+        stats = [s.stats() for s in _servers.values()]
+    batches = sum(s["batches"] for s in stats)
+    rows = sum(s["rows"] for s in stats)
+    return {
+        "queued_frames": sum(s["queued_rows"] for s in stats),
+        "batches": batches,
+        "frames": rows,
+        "mean_batch": rows / batches if batches else 0.0,
+    }
+
+
+def _run(batches, capacity, batch_size):
+    """
+    Activations for each array in `batches`, in order: through the
+    shared server (keeping two requests in flight) or directly.
+    """
+    if not Config.CREPE_SERVER:
+        model = get_model(capacity)
+        for x in batches:
+            yield model.predict(x, batch_size=batch_size, verbose=0)
+        return
+
+    server = get_server(capacity)
+    pending = deque()
+    for x in batches:
+        pending.append(server.submit(x))
+        if len(pending) > 1:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def activations(frames, active=None, batch_size=None, capacity=None):
+    """
+    CREPE activations (n_frames, 360) for a CrepeFrames grid.
+
+    Frames where `active` is False are not run through the model; their
+    rows copy the nearest preceding active row so Viterbi decoding sees no
+    evidence for a pitch change across them.
+    """
+    batch_size = batch_size or Config.CREPE_BATCH_SIZE
+
+    n = len(frames)
+    idx = np.arange(n) if active is None else np.flatnonzero(active)
+    out = np.zeros((n, N_BINS), dtype=np.float32)
+
+    chunks = [idx[i:i + batch_size] for i in range(0, len(idx), batch_size)]
+    results = _run((frames.batch(b) for b in chunks), capacity, batch_size)
+    for b, act in zip(chunks, results):
+        out[b] = act
+
+    if active is not None and len(idx) and len(idx) < n:
+        fill = np.maximum.accumulate(np.where(active, np.arange(n), -1))
+        fill[fill < 0] = idx[0]
+        out = out[fill]
+
+    return out
+
+
+def predict(frames, active=None, batch_size=None, capacity=None):
+    """
+    Viterbi-decoded pitch (Hz) and confidence. Skipped frames get
+    confidence 0.
+    """
+    from crepe.core import to_viterbi_cents
+
+    if active is not None and not active.any():
+        return np.zeros(len(frames)), np.zeros(len(frames), dtype=np.float32)
+
+    act = activations(frames, active, batch_size, capacity)
+    conf = act.max(axis=1)
+    if active is not None:
+        conf[~active] = 0
+
+    cents = to_viterbi_cents(act)
+    f0 = 10 * 2 ** (cents / 1200)
+    f0[np.isnan(f0)] = 0
+    return f0, conf
+
+
+def predict_local(frames, batch_size=None, capacity=None):
+    """
+    Per-frame pitch and confidence for normalized (n, 1024) frames, using
+    the local weighted average instead of Viterbi so no future frames are
+    needed (streaming).
+    """
+    from crepe.core import to_local_average_cents
+
+    if not len(frames):
+        return np.zeros(0), np.zeros(0, dtype=np.float32)
+
+    batch_size = batch_size or Config.CREPE_BATCH_SIZE
+    act = np.concatenate(list(_run(
+        [frames[i:i + batch_size] for i in range(0, len(frames), batch_size)],
+        capacity, batch_size
+    )))
+    cents = to_local_average_cents(act)
+    f0 = 10 * 2 ** (cents / 1200)
+    f0[np.isnan(f0)] = 0
+    return f0, act.max(axis=1)
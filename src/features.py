@@ -0,0 +1,85 @@
+import numpy as np
+from src.framing import frame_signal, frame_rms
+
+
+class FeatureStore:
+    """
+    Per-signal cache of framing and spectral features.
+
+    Each feature is computed on first use and memoized under its
+    parameters (hop, n_fft, ...), so rhythm, pitch and visualization
+    share one STFT / mel / RMS pass. Consumers are named up front and
+    call release() when done; after the last one everything, including
+    the signal, is dropped.
+    """
+
+    def __init__(self, y, sr, consumers=()):
+        self.y = y
+        self.sr = sr
+        self._features = {}
+        self._consumers = set(consumers)
+
+    def _get(self, key, compute):
+        if self.y is None:
+            raise RuntimeError("FeatureStore was already released")
+        if key not in self._features:
+            self._features[key] = compute()
+        return self._features[key]
+
+    def frames(self, frame_length, hop):
+        """Centered frame view, shape (frame_length, n_frames)."""
+        return self._get(
+            ("frames", frame_length, hop),
+            lambda: frame_signal(self.y, frame_length, hop)
+        )
+
+    def rms(self, frame_length, hop):
+        """Un-normalized RMS per frame."""
+        return self._get(
+            ("rms", frame_length, hop),
+            lambda: frame_rms(self.frames(frame_length, hop))
+        )
+
+    def stft_mag(self, n_fft, hop):
+        import librosa
+
+        return self._get(
+            ("stft_mag", n_fft, hop),
+            lambda: np.abs(librosa.stft(self.y, n_fft=n_fft, hop_length=hop))
+        )
+
+    def mel(self, n_fft, hop, n_mels=128):
+        """Mel power spectrogram, built from the shared STFT."""
+        import librosa
+
+        return self._get(
+            ("mel", n_fft, hop, n_mels),
+            lambda: librosa.feature.melspectrogram(
+                S=self.stft_mag(n_fft, hop) ** 2, sr=self.sr, n_fft=n_fft, n_mels=n_mels
+            )
+        )
+
+    def onset_envelope(self, hop, n_fft=2048):
+        """
+        Same envelope librosa.beat.beat_track computes internally
+        (median-aggregated spectral flux of the dB mel spectrogram).
+        """
+        import librosa
+
+        return self._get(
+            ("onset", n_fft, hop),
+            lambda: librosa.onset.onset_strength(
+                S=librosa.power_to_db(self.mel(n_fft, hop)),
+                sr=self.sr, hop_length=hop, n_fft=n_fft, aggregate=np.median
+            )
+        )
+
+    def release(self, consumer):
+        """
+        Mark `consumer` as finished; frees everything after the last one.
+        """
+        self._consumers.discard(consumer)
+        if not self._consumers:
+            self._features.clear()
+            self.y = None
+
@@ -0,0 +1,66 @@
+import numpy as np
+
+CREPE_SR = 16000
+CREPE_FRAME = 1024
+
+
+def frame_signal(y, frame_length, hop):
+    """
+    Centered, zero-padded frame view of y with shape (frame_length, n_frames).
+
+    Uses the same grid as librosa's center=True features, so frame k is
+    centered on sample k * hop. No data is copied.
+    """
+    import librosa
+
+    y = np.pad(y, frame_length // 2, mode="constant")
+    return librosa.util.frame(y, frame_length=frame_length, hop_length=hop)
+
+
+def frame_rms(frames):
+    """
+    RMS of each column of a frame view, without materializing frames ** 2.
+    """
+    return np.sqrt(np.einsum("ij,ij->j", frames, frames) / frames.shape[0])
+
+
+class CrepeFrames:
+    """
+    CREPE input frames (1024 samples at 16 kHz) centered on the same
+    instants as the analysis frame grid.
+
+    The 16 kHz signal is resampled once and exposed as a sliding-window
+    view; batches are gathered from it on demand, so the full frame
+    matrix never exists at once.
+    """
+
+    def __init__(self, y, sr, hop, n_frames):
+        import librosa
+
+        y16 = librosa.resample(y, orig_sr=sr, target_sr=CREPE_SR)
+        y16 = np.pad(y16, CREPE_FRAME // 2, mode="constant")
+        self._windows = np.lib.stride_tricks.sliding_window_view(y16, CREPE_FRAME)
+
+        # Exact frame centers at 16 kHz (hop is not an integer number of
+        # 16 kHz samples, so rounding per frame avoids drift)
+        centers = np.round(np.arange(n_frames) * hop * CREPE_SR / sr).astype(int)
+        self.starts = np.minimum(centers, len(self._windows) - 1)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def batch(self, idx):
+        """
+        Normalized frames for the given frame indices, shape (len(idx), 1024).
+        """
+        return normalize_crepe_frames(self._windows[self.starts[idx]])
+
+
+def normalize_crepe_frames(frames):
+    """
+    Zero-mean, unit-variance float32 copy of (n, 1024) frames, as CREPE expects.
+    """
+    frames = frames.astype(np.float32)
+    frames -= frames.mean(axis=1, keepdims=True)
+    frames /= np.clip(frames.std(axis=1, keepdims=True), 1e-8, None)
+    return frames
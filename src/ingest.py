@@ -0,0 +1,131 @@
+"""
+Single-pass decode and resample of an uploaded recording.
+
+The file is decoded (soundfile for wav/flac/ogg/mp3, torchcodec for
+containers libsndfile can't open such as m4a, librosa as a last resort)
+and pushed block by block through one soxr.ResampleStream per target
+rate, so all requested rates come out of one decode.
+Config.INGEST_QUALITY trades resampling quality for speed.
+
+Scope: only wav/flac/ogg (and torchcodec formats) are decoded block by
+block. libsndfile's MP3 decoder corrupts samples after any partial read,
+sequential ones included, so an MP3 (the common upload) is read in one
+call, pre-rolled when it starts at an offset (see audio_io.read_frames),
+and only the resampling is blockwise. Decoding also starts only once the
+upload is on disk (src/api.py saves it first); it is not overlapped with
+the transfer.
+"""
+import numpy as np
+from src.config import Config
+from src.audio_io import read_frames
+
+
+def _open_soundfile(path, block_seconds, offset, duration):
+    import soundfile as sf
+
+    f = sf.SoundFile(path)
+    sr = f.samplerate
+    start = int(offset * sr)
+    frames = -1 if duration is None else int(duration * sr)
+
+    def blocks():
+        with f:
+            if f.subtype.startswith("MPEG"):
+                # One read (see the module docstring), sliced into blocks
+                y = read_frames(f, start, frames)
+                step = int(block_seconds * sr)
+                for i in range(0, y.shape[1], step):
+                    yield y[:, i:i + step]
+                return
+            f.seek(start)
+            for block in f.blocks(blocksize=int(block_seconds * sr), frames=frames,
+                                  dtype="float32", always_2d=True):
+                yield block.T
+
+    return sr, f.channels, blocks()
+
+
+def _open_torchcodec(path, block_seconds, offset, duration):
+    from torchcodec.decoders import AudioDecoder
+
+    decoder = AudioDecoder(path)
+    meta = decoder.metadata
+    total = meta.duration_seconds_from_header
+    stop = total if duration is None else offset + duration
+    if total is not None and stop is not None:
+        stop = min(stop, total)
+
+    def blocks():
+        if stop is None:
+            # No duration in the header: one range to the end
+            yield decoder.get_samples_played_in_range(offset).data.numpy()
+            return
+        t = offset
+        while t < stop:
+            end = min(t + block_seconds, stop)
+            yield decoder.get_samples_played_in_range(t, end).data.numpy()
+            t = end
+
+    return meta.sample_rate, meta.num_channels, blocks()
+
+
+def _open_librosa(path, block_seconds, offset, duration):
+    import librosa
+
+    y, sr = librosa.load(path, sr=None, mono=False, offset=offset, duration=duration)
+    y = np.atleast_2d(y)
+    return sr, y.shape[0], iter([y])
+
+
+def _open(path, block_seconds, offset, duration):
+    errors = []
+    for opener in (_open_soundfile, _open_torchcodec):
+        try:
+            return opener(path, block_seconds, offset, duration)
+        except (ImportError, RuntimeError, ValueError) as e:
+            errors.append(f"{opener.__name__}: {e}")
+    print("Block decoders unavailable, loading whole file:", "; ".join(errors))
+    return _open_librosa(path, block_seconds, offset, duration)
+
+
+def ingest(path, rates, mono=False, offset=0.0, duration=None, quality=None):
+    """
+    Decode `path` once and resample it to every rate in `rates`; a rate
+    of None keeps the file's own rate (no resampling).
+
+    Returns {rate: float32 array}, shaped (channels, samples), or
+    (samples,) with mono=True. offset / duration (seconds) decode only
+    part of the file.
+    """
+    import soxr
+
+    quality = quality or Config.INGEST_QUALITY
+    sr, channels, blocks = _open(path, Config.INGEST_BLOCK_SECONDS, offset, duration)
+    out_channels = 1 if mono else channels
+    rates = list(dict.fromkeys(sr if rate is None else rate for rate in rates))
+
+    streams = {
+        rate: None if rate == sr else soxr.ResampleStream(
+            sr, rate, out_channels, dtype="float32", quality=quality
+        )
+        for rate in rates
+    }
+    parts = {rate: [] for rate in rates}
+
+    for block in blocks:
+        if mono:
+            block = block.mean(axis=0, keepdims=True)
+        x = np.ascontiguousarray(block.T, dtype=np.float32)   # soxr: (samples, channels)
+        for rate, stream in streams.items():
+            parts[rate].append(x if stream is None else stream.resample_chunk(x))
+
+    empty = np.zeros((0, out_channels), dtype=np.float32)
+    for rate, stream in streams.items():
+        if stream is not None:
+            parts[rate].append(stream.resample_chunk(empty, last=True))
+
+    out = {}
+    for rate in rates:
+        y = np.concatenate(parts[rate] or [empty]).T
+        out[rate] = y[0] if mono else y
+    return out
@@ -0,0 +1,194 @@
+import multiprocessing, os, queue, shutil, threading, time, uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from src.config import Config
+from src.metrics import metrics
+from src.warmup import state as warmup_state, warm_models, warm_up
+
+_events = None
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _init_worker(events):
+    """
+    Runs once in each pool process: keep the progress queue and warm the
+    models so the first job on this worker doesn't pay for loading them.
+    """
+    global _events
+    _events = events
+    warm_models()
+
+
+def _warm_worker():
+    # Fills this process's warm-up state (read by /healthz); with the
+    # thread executor all workers share one warm-up
+    warm_up()
+    if warmup_state["error"]:
+        raise RuntimeError(warmup_state["error"])
+    return True
+
+
+def _run_job(job_id, audio_path, outdir, options):
+    from src.main import main
+
+    def progress(stage, step, total):
+        _events.put((job_id, stage, step, total))
+
+    return main(audio_path, outdir=outdir, progress=progress, **options)
+
+
+def _remove(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+class JobManager:
+    """
+    Bounded pool of warm workers behind a job table.
+
+    submit() raises QueueFull once JOB_WORKERS jobs are running and
+    JOB_MAX_PENDING more are waiting. Finished jobs are forgotten after
+    JOB_TTL, and the files they own (see submit) are deleted with them.
+
+    executor="thread" (the Config.JOB_EXECUTOR default) runs jobs on
+    threads of this process, so concurrent jobs share one model copy and
+    one CREPE batching server; a stage that overlapped another job's
+    reports process-wide CPU time and peak RSS ("exclusive": False). executor="process" gives each job
+    a worker process of its own, with no batching across jobs.
+    """
+
+    def __init__(self, workers=None, max_pending=None, executor=None):
+        self.workers = workers or Config.JOB_WORKERS
+        self.max_pending = Config.JOB_MAX_PENDING if max_pending is None else max_pending
+        self.executor = executor or Config.JOB_EXECUTOR
+
+        if self.executor == "thread":
+            self._events = queue.Queue()
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self._events,)
+            )
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            self._events = ctx.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(self._events,)
+            )
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+        self._jobs = {}
+        self._files = {}      # job_id -> paths deleted when the job expires
+        self._lock = threading.Lock()
+
+        # One warm-up task per worker makes the pool start every process
+        # now (and JIT / run the models once) instead of on first request
+        self._warmup = [self._executor.submit(_warm_worker) for _ in range(self.workers)]
+
+        threading.Thread(target=self._drain_events, daemon=True).start()
+
+    def submit(self, audio_path, outdir=None, remove_input=False, **options):
+        """
+        options are passed through to main() (e.g. render_png=True).
+
+        The job owns its default output directory, and audio_path too if
+        remove_input is set (e.g. an upload); both are deleted once the
+        finished job expires.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise QueueFull()
+
+        job_id = uuid.uuid4().hex
+        owned = [audio_path] if remove_input else []
+        if outdir is None:
+            outdir = os.path.join(Config.JOB_OUTPUT_DIR, job_id)
+            owned.append(outdir)
+
+        with self._lock:
+            expired = self._prune()
+            self._files[job_id] = owned
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "stage": None,
+                "step": 0,
+                "total": 0,
+                "created": time.time(),
+                "finished": None,
+                "result": None,
+                "error": None,
+            }
+
+        _remove(expired)
+
+        future = self._executor.submit(_run_job, job_id, audio_path, outdir, options)
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def ready(self):
+        return all(f.done() and not f.exception() for f in self._warmup)
+
+    def warmup_error(self):
+        for f in self._warmup:
+            if f.done() and f.exception():
+                return repr(f.exception())
+        return None
+
+    def queue_depth(self):
+        with self._lock:
+            return sum(j["status"] == "queued" for j in self._jobs.values())
+
+    def running(self):
+        with self._lock:
+            return sum(j["status"] == "running" for j in self._jobs.values())
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, job_id, future):
+        self._slots.release()
+        with self._lock:
+            job = self._jobs[job_id]
+            job["finished"] = time.time()
+            if future.cancelled():
+                job["status"] = "cancelled"
+            elif future.exception() is not None:
+                job["status"] = "failed"
+                job["error"] = repr(future.exception())
+            else:
+                job["status"] = "done"
+                job["result"] = future.result()
+                metrics.observe(job["result"].get("timings", {}))
+
+    def _drain_events(self):
+        while True:
+            job_id, stage, step, total = self._events.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job and job["status"] in ("queued", "running"):
+                    job.update(status="running", stage=stage, step=step, total=total)
+
+    def _prune(self):
+        """
+        Forget jobs that finished more than JOB_TTL ago; returns the files
+        they owned for the caller to delete outside the lock.
+        """
+        cutoff = time.time() - Config.JOB_TTL
+        expired = []
+        for job_id in [k for k, j in self._jobs.items()
+                       if j["finished"] and j["finished"] < cutoff]:
+            del self._jobs[job_id]
+            expired.extend(self._files.pop(job_id, []))
+        return expired
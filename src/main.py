@@ -1,72 +1,322 @@
 import sys, os
+from contextlib import contextmanager
 from src.config import Config
-from src.audio_io import load_audio
-from src.separation import separate_vocals_demucs
+from src.metrics import timed_stage, format_timings
+from src.audio_io import load_audio, resample_audio, write_debug_audio
+from src.ingest import ingest
+from src.cache import get_cache, file_digest, stage_key
+from src.chunked import audio_duration, use_chunked, analyze_chunked
+from src.vocal_check import check_vocal
+from src.separation import separate
+from src.features import FeatureStore
 from src.pitch import extract_pitch_vocal
 from src.rhythm import detect_beats
 from src.postprocess import bridge_short_gaps, enforce_beatwise_pitch
-from src.synthesis import resynthesize_f0
-from src.visualization import plot_pitch
+from src.synthesis import iter_resynthesize_f0
+from src.visualization import plot_pitch, contour_payload
+from src.result_io import write_result
 from src.notes import segment_notes_from_pitch   # ✅ MISSING IMPORT
 import soundfile as sf
+import numpy as np
 
+STAGES = [
+    "decode", "vocal_check", "separation", "load", "rhythm", "pitch",
+    "postprocess", "notes", "resynthesis", "visualization"
+]
 
-def main(audio_path):
-    os.makedirs("outputs", exist_ok=True)
 
-    # 1. Vocal separation
-    vocal = separate_vocals_demucs(audio_path)
+def _separate_and_load(audio_path, stage, use_separation=True, decoded=None):
+    """
+    decoded: {rate: (channels, samples)} from an earlier ingest() of
+    audio_path; a missing separation rate is resampled from the highest
+    rate in it, or decoded here when it is empty.
+    """
+    decoded = decoded or {}
 
-    # 2. Load audio
-    y, sr = load_audio(vocal, Config.SAMPLE_RATE)
+    if not use_separation:
+        # Already an isolated vocal: decode straight to the analysis rate
+        with stage("load"):
+            y = decoded.get(Config.SAMPLE_RATE)
+            if y is None:
+                return load_audio(audio_path, Config.SAMPLE_RATE)
+            return y.mean(axis=0), Config.SAMPLE_RATE
 
-    # 3. Rhythm
-    tempo, beats = detect_beats(y, sr, Config.HOP_LENGTH)
-    print(f"Tempo: {float(tempo):.1f} BPM")
+    # 1. Vocal separation (decoded once at the separation rate)
+    with stage("separation"):
+        mix_sr = Config.SEPARATION_SR
+        mix = decoded.pop(mix_sr, None)
+        if mix is None and decoded:
+            src_sr = max(decoded)
+            mix, mix_sr = resample_audio(decoded.pop(src_sr), src_sr, mix_sr)
+        elif mix is None:
+            mix, mix_sr = load_audio(audio_path, mix_sr, mono=False)
+        write_debug_audio("input.wav", mix, mix_sr)
 
-    # 4. Pitch extraction
-    pitch = extract_pitch_vocal(y, sr)
+        vocal, vocal_sr = separate(mix, mix_sr)
+        del mix
+        write_debug_audio("vocals.wav", vocal, vocal_sr)
 
-    # 5. Post-processing
-    pitch["pitch_smooth"] = bridge_short_gaps(
-        pitch["pitch_smooth"],
-        max_gap_frames=12
+    # 2. Resample vocal stem to the analysis rate
+    with stage("load"):
+        return resample_audio(vocal, vocal_sr, Config.SAMPLE_RATE)
+
+
+def _render_plot(pitch, beats, pitch_plot):
+    plot_pitch(
+        pitch.times,
+        pitch.f0,
+        beats,
+        pitch_plot
     )
+    with open(pitch_plot, "rb") as f:
+        return f.read()
+
+
+def main(audio_path, outdir="outputs", progress=None, render_png=None,
+         separation=None):
+    """
+    progress: optional callback(stage, step, total) called as each
+    numbered stage starts.
+
+    The pitch plot is returned as a compact "contour" payload for the
+    client to draw; render_png (default Config.RENDER_PLOT_PNG) also
+    writes the matplotlib PNG to "pitch_plot".
+
+    separation: "auto" (pre-check whether the upload is already an
+    isolated vocal), "always" or "never"; default Config.SEPARATION_MODE.
+    The decision is returned under "separation".
+
+    Wall time, CPU time and peak RSS of every stage are returned under
+    "timings".
+    """
+    os.makedirs(outdir, exist_ok=True)
+    cache = get_cache()
+    timings = {}
 
-    pitch["pitch_smooth"] = enforce_beatwise_pitch(
-        pitch["times"],
-        pitch["pitch_smooth"],
-        beats
+    @contextmanager
+    def stage(name):
+        if progress is not None:
+            progress(name, STAGES.index(name) + 1, len(STAGES))
+        with timed_stage(timings, name) as timer:
+            yield timer
+
+    def cached(timer, key, fn):
+        """cache.get_or_compute that marks a hit on the stage timer."""
+        value = cache.get(key)
+        timer["cached"] = value is not None
+        if value is None:
+            value = fn()
+            cache.put(key, value)
+        return value
+
+    hop = Config.HOP_LENGTH
+    audio_key = file_digest(audio_path)
+
+    # 0. Skip Demucs for a cappella uploads
+    separation = separation or Config.SEPARATION_MODE
+    if separation not in ("auto", "always", "never"):
+        raise ValueError(f"Unknown separation mode: {separation!r}")
+
+    check_key = stage_key(
+        audio_key, "vocal_check",
+        excerpts=Config.VOCAL_CHECK_EXCERPTS,
+        seconds=Config.VOCAL_CHECK_SECONDS,
+        flatness=Config.VOCAL_CHECK_FLATNESS,
+        percussive=Config.VOCAL_CHECK_PERCUSSIVE,
+        low_hz=Config.VOCAL_CHECK_LOW_HZ,
+        low_share=Config.VOCAL_CHECK_LOW_SHARE
     )
 
-    # 6. Note segmentation  ✅ THIS FIXES YOUR ERROR
-    notes = segment_notes_from_pitch(pitch)
+    # Long recordings: separation, rhythm and pitch run window by window
+    chunked = use_chunked(audio_path)
+
+    # A fresh pre-check and separation share one decode of the upload:
+    # the analysis rate and the file's own rate come out of a single pass
+    # (see src/ingest.py); the separation rate is only resampled once the
+    # check has decided to separate
+    decoded = {}
+    if separation == "auto" and not chunked and cache.get(check_key) is None:
+        with stage("decode"):
+            decoded = ingest(audio_path, (Config.SAMPLE_RATE, None))
+            print(f"Decoded {audio_path} "
+                  f"({decoded[Config.SAMPLE_RATE].shape[-1] / Config.SAMPLE_RATE:.2f}s)")
 
-    # 7. Resynthesis
-    y_syn = resynthesize_f0(
-        pitch["pitch_smooth"],
-        sr,
-        Config.HOP_LENGTH
+    with stage("vocal_check") as timer:
+        if separation == "auto":
+            y = decoded[Config.SAMPLE_RATE].mean(axis=0) if decoded else None
+            decision = cached(
+                timer, check_key, lambda: check_vocal(audio_path, audio_duration(audio_path), y)
+            )
+            del y
+        else:
+            decision = {"separate": separation == "always", "confidence": 1.0, "cues": None}
+    decision = dict(decision, mode=separation)
+    print(f"Separation: {'on' if decision['separate'] else 'off'} "
+          f"({separation}, confidence {decision['confidence']:.2f})")
+
+    # Stage keys: each stage depends on its inputs and its own parameters
+    vocal_key = stage_key(
+        audio_key, "vocal",
+        separate=decision["separate"],
+        backend=Config.SEPARATION_BACKEND,
+        model=Config.SEPARATION_MODEL,
+        sep_sr=Config.SEPARATION_SR,
+        sr=Config.SAMPLE_RATE
+    )
+    beats_key = stage_key(vocal_key, "beats", hop=hop)
+    pitch_key = stage_key(
+        vocal_key, "pitch",
+        hop=hop, fmin=Config.FMIN, fmax=Config.FMAX,
+        frame=Config.FRAME_LENGTH,
+        pyin_veto=Config.PYIN_VETO,
+        crepe=Config.CREPE_CAPACITY, skip_gated=Config.CREPE_SKIP_GATED,
+        rms_gate=Config.RMS_GATE,
+        track="float32"
     )
-    resynth_path = "outputs/resynth.wav"
-    sf.write(resynth_path, y_syn, sr)
+
+    if chunked:
+        beats_key = pitch_key = stage_key(
+            [beats_key, pitch_key], "chunked",
+            window=Config.CHUNK_SECONDS,
+            overlap=Config.CHUNK_OVERLAP_SECONDS
+        )
+
+    post_key = stage_key(
+        [pitch_key, beats_key], "post",
+        max_gap=Config.MAX_GAP_FRAMES,
+        max_flat_cents=Config.MAX_FLAT_CENTS
+    )
+    notes_key = stage_key(
+        post_key, "notes", min_dur=Config.MIN_NOTE_DURATION
+    )
+    plot_key = stage_key([post_key, beats_key], "plot")
+    level_key = stage_key(vocal_key, "level", hop=hop, frame=Config.FRAME_LENGTH)
+
+    sr = Config.SAMPLE_RATE
+    level = cache.get(level_key)
+
+    if chunked:
+        # 1-4. Windowed with bounded memory
+        tempo, beats, pitch = cache.get_or_compute(
+            pitch_key, lambda: analyze_chunked(audio_path, stage, decision["separate"])
+        )
+    else:
+        rhythm = cache.get(beats_key)
+        pitch = cache.get(pitch_key)
+
+        # 1-2. Separation + load (only when a downstream stage misses)
+        if rhythm is None or pitch is None or level is None:
+            vocal = cache.get(vocal_key)
+            if vocal is None:
+                vocal = _separate_and_load(
+                    audio_path, stage, decision["separate"], decoded
+                )
+                cache.put(vocal_key, vocal)
+            decoded.clear()
+            y, sr = vocal
+
+            # STFT / framing shared by rhythm, pitch and the plot level
+            features = FeatureStore(y, sr, consumers=("rhythm", "pitch", "visualization"))
+            del vocal, y
+        else:
+            features = None
+
+        # 3. Rhythm
+        with stage("rhythm") as timer:
+            timer["cached"] = rhythm is not None
+            if rhythm is None:
+                rhythm = detect_beats(features.y, sr, hop, features)
+                cache.put(beats_key, rhythm)
+            if features is not None:
+                features.release("rhythm")
+        tempo, beats = rhythm
+
+        # 4. Pitch extraction
+        with stage("pitch") as timer:
+            timer["cached"] = pitch is not None
+            if pitch is None:
+                pitch = extract_pitch_vocal(features.y, sr, features)
+                cache.put(pitch_key, pitch)
+            if features is not None:
+                features.release("pitch")
+
+            # Loudness envelope for the contour plot (RMS is already
+            # memoized by pitch); this releases the features
+            if level is None:
+                level = features.rms(Config.FRAME_LENGTH, hop)
+                level = level / (np.max(level) + 1e-6)
+                cache.put(level_key, level)
+            if features is not None:
+                features.release("visualization")
+    print(f"Tempo: {float(tempo):.1f} BPM")
+
+    # 5. Post-processing
+    def postprocess():
+        # One copy: the (possibly cached) pitch track is left intact and
+        # the beat-wise pass edits the bridged buffer in place
+        f0 = bridge_short_gaps(
+            pitch.f0,
+            max_gap_frames=Config.MAX_GAP_FRAMES
+        )
+
+        return enforce_beatwise_pitch(
+            pitch.times,
+            f0,
+            beats,
+            max_flat_cents=Config.MAX_FLAT_CENTS,
+            inplace=True
+        )
+
+    with stage("postprocess") as timer:
+        pitch = pitch.with_f0(cached(timer, post_key, postprocess))
+
+    # 6. Note segmentation  ✅ THIS FIXES YOUR ERROR
+    with stage("notes") as timer:
+        notes = cached(timer, notes_key, lambda: segment_notes_from_pitch(pitch))
+
+    # 7. Resynthesis (streamed to disk block by block)
+    resynth_path = os.path.join(outdir, "resynth.wav")
+    with stage("resynthesis"), \
+            sf.SoundFile(resynth_path, "w", samplerate=sr, channels=1) as out:
+        for block in iter_resynthesize_f0(pitch.f0, sr, hop):
+            out.write(block)
 
     # 8. Visualization
-    pitch_plot = "outputs/pitch.png"
-    plot_pitch(
-        pitch["times"],
-        pitch["pitch_smooth"],
-        beats,
-        pitch_plot
+    if render_png is None:
+        render_png = Config.RENDER_PLOT_PNG
+    pitch_plot = os.path.join(outdir, "pitch.png") if render_png else None
+
+    with stage("visualization"):
+        contour = contour_payload(
+            pitch.times, pitch.f0, beats, notes, level=level
+        )
+
+        if render_png:
+            png = cache.get(plot_key)
+            if png is None:
+                cache.put(plot_key, _render_plot(pitch, beats, pitch_plot))
+            else:
+                with open(pitch_plot, "wb") as f:
+                    f.write(png)
+
+    # Columnar binary copy of the result (see src/result_io.py)
+    result_path = write_result(
+        os.path.join(outdir, "result.vcr"), pitch, beats, notes, tempo
     )
 
+    print(format_timings(timings))
     print("✅ Analysis complete")
 
     # 9. RETURN OBJECT (for Gradio / HF Spaces)
     return {
         "resynth_path": resynth_path,
         "pitch_plot": pitch_plot,
-        "notes": notes
+        "result_path": result_path,
+        "notes": notes,
+        "contour": contour,
+        "separation": decision,
+        "tempo": float(tempo),
+        "timings": timings
     }
 
 
@@ -74,6 +324,7 @@ def main(audio_path):
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python main.py <audio_file>")
+        print("       python -m src.batch <folder|manifest>  (many files)")
         sys.exit(1)
 
     main(sys.argv[1])
@@ -0,0 +1,173 @@
+import resource, sys, threading, time
+from contextlib import contextmanager
+
+# Histogram buckets for per-stage wall time (seconds)
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _reset_peak_rss():
+    # Linux lets a process reset its high-water mark (VmHWM)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+# Stages being timed in this process (jobs on a thread executor overlap)
+_inflight = []
+_inflight_lock = threading.Lock()
+
+
+@contextmanager
+def timed_stage(timings, stage):
+    """
+    Record wall time, CPU time and peak RSS of the enclosed block into
+    timings[stage]. Repeated stages (chunked windows) accumulate.
+
+    CPU time and peak RSS are process-wide readings. They describe the
+    stage only if no other stage ran at any point during it; otherwise
+    the entry gets "exclusive": False and they cover the whole process.
+    The peak is only reset when nothing else is being measured.
+
+    Yields a dict; set its "cached" to True when the stage was served
+    from the result cache.
+    """
+    probe = {"exclusive": True, "cached": False}
+    with _inflight_lock:
+        if _inflight:
+            probe["exclusive"] = False
+            for other in _inflight:
+                other["exclusive"] = False
+        else:
+            _reset_peak_rss()
+        _inflight.append(probe)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield probe
+    finally:
+        with _inflight_lock:
+            _inflight.remove(probe)
+        entry = timings.setdefault(stage, {
+            "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": 0.0,
+            "exclusive": True, "cached": True
+        })
+        entry["wall_s"] += time.perf_counter() - wall
+        entry["cpu_s"] += time.process_time() - cpu
+        entry["peak_rss_mb"] = max(entry["peak_rss_mb"], _peak_rss_mb())
+        entry["exclusive"] = entry["exclusive"] and probe["exclusive"]
+        entry["cached"] = entry["cached"] and probe["cached"]
+
+
+def format_timings(timings):
+    return "\n".join(
+        f"⏱ {stage:14s} {t['wall_s']:7.2f}s  cpu {t['cpu_s']:7.2f}s  "
+        f"peak {t['peak_rss_mb']:7.0f} MB"
+        + (" (cached)" if t.get("cached") else "")
+        + ("" if t.get("exclusive", True) else " (process-wide)")
+        for stage, t in timings.items()
+    )
+
+
+class StageMetrics:
+    """
+    Process-wide aggregate of stage timings, rendered in the Prometheus
+    text exposition format. Cache hits are only counted, not fed into
+    the latency histogram, and CPU / peak RSS come from stages that ran
+    alone (see timed_stage).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wall = {}
+        self._cpu = {}
+        self._count = {}
+        self._buckets = {}
+        self._peak_rss = {}
+        self._hits = {}
+        self._gauges = {}
+        self._counters = {}
+
+    def observe(self, timings):
+        with self._lock:
+            for stage, t in timings.items():
+                if t.get("cached"):
+                    self._hits[stage] = self._hits.get(stage, 0) + 1
+                    continue
+                self._wall[stage] = self._wall.get(stage, 0.0) + t["wall_s"]
+                self._count[stage] = self._count.get(stage, 0) + 1
+                if t.get("exclusive", True):
+                    self._cpu[stage] = self._cpu.get(stage, 0.0) + t["cpu_s"]
+                    self._peak_rss[stage] = max(self._peak_rss.get(stage, 0.0), t["peak_rss_mb"])
+                counts = self._buckets.setdefault(stage, [0] * len(BUCKETS))
+                for i, b in enumerate(BUCKETS):
+                    if t["wall_s"] <= b:
+                        counts[i] += 1
+
+    def set_gauge(self, name, value, help_text=""):
+        with self._lock:
+            self._gauges[name] = (value, help_text)
+
+    def set_counter(self, name, value, help_text=""):
+        """Export a monotonically increasing total kept elsewhere."""
+        with self._lock:
+            self._counters[name] = (value, help_text)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP voicecoach_stage_seconds Wall time per pipeline stage",
+                "# TYPE voicecoach_stage_seconds histogram",
+            ]
+            for stage in sorted(self._count):
+                for b, c in zip(BUCKETS, self._buckets[stage]):
+                    lines.append(f'voicecoach_stage_seconds_bucket{{stage="{stage}",le="{b}"}} {c}')
+                lines.append(f'voicecoach_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {self._count[stage]}')
+                lines.append(f'voicecoach_stage_seconds_sum{{stage="{stage}"}} {self._wall[stage]:.6f}')
+                lines.append(f'voicecoach_stage_seconds_count{{stage="{stage}"}} {self._count[stage]}')
+
+            lines += [
+                "# HELP voicecoach_stage_cpu_seconds_total CPU time per pipeline stage (runs with no other stage in flight)",
+                "# TYPE voicecoach_stage_cpu_seconds_total counter",
+            ]
+            for stage in sorted(self._cpu):
+                lines.append(f'voicecoach_stage_cpu_seconds_total{{stage="{stage}"}} {self._cpu[stage]:.6f}')
+
+            lines += [
+                "# HELP voicecoach_stage_peak_rss_megabytes Highest peak RSS seen during a stage (runs with no other stage in flight)",
+                "# TYPE voicecoach_stage_peak_rss_megabytes gauge",
+            ]
+            for stage in sorted(self._peak_rss):
+                lines.append(f'voicecoach_stage_peak_rss_megabytes{{stage="{stage}"}} {self._peak_rss[stage]:.1f}')
+
+            lines += [
+                "# HELP voicecoach_stage_cache_hits_total Stages served from the result cache",
+                "# TYPE voicecoach_stage_cache_hits_total counter",
+            ]
+            for stage in sorted(self._hits):
+                lines.append(f'voicecoach_stage_cache_hits_total{{stage="{stage}"}} {self._hits[stage]}')
+
+            for name, (value, help_text) in sorted(self._gauges.items()):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+            for name, (value, help_text) in sorted(self._counters.items()):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {value}"]
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = StageMetrics()
@@ -1,85 +1,89 @@
 import numpy as np
-import librosa
 from src.config import Config
+from src.runs import run_bounds, run_indices, run_median
 
 _NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F',
                'F#', 'G', 'G#', 'A', 'A#', 'B']
 
+# More tolerant threshold (matches your latest logic)
+CHANGE_THRESH = 1.5   # semitones
+MIN_NOTE_FRAMES = 5   # ignore extremely short notes
+
 
 def _midi_to_note_name(midi):
     return _NOTE_NAMES[int(midi) % 12] + str(int(midi) // 12 - 1)
 
 
-def segment_notes_from_pitch(pitch_data):
-    """
-    Segment continuous pitch into musical notes.
-
-    Uses tolerant thresholds to avoid splitting notes
-    during vibrato or expressive drift.
-    """
-    times = pitch_data["times"]
-    f0 = pitch_data["pitch_smooth"]
-
-    # Convert Hz → MIDI safely
-    midi = librosa.hz_to_midi(np.maximum(f0, 1e-6))
-    voiced = ~np.isnan(f0)
-
-    notes = []
-    current = []
-
-    # More tolerant threshold (matches your latest logic)
-    CHANGE_THRESH = 1.5   # semitones
-    MIN_NOTE_FRAMES = 5   # ignore extremely short notes
+def _note(start, end, note_int, cents_mean, cents_std):
+    return {
+        "start": float(start),
+        "end": float(end),
+        "duration": float(end - start),
+        "midi": note_int,
+        "note_name": _midi_to_note_name(note_int),
+        "cents_off_mean": float(cents_mean),
+        "cents_off_std": float(cents_std),
+    }
 
-    for i in range(1, len(f0)):
-        if not voiced[i]:
-            if current and len(current) >= MIN_NOTE_FRAMES:
-                notes.append(current)
-            current = []
-            continue
 
-        if not current:
-            current = [i]
-            continue
+def make_note(start, end, midi_seg):
+    """
+    Note metadata for one segment, or None if it is too short.
+    """
+    if end - start < Config.MIN_NOTE_DURATION:
+        return None
 
-        prev_midi = midi[current[-1]]
-        curr_midi = midi[i]
+    note_int = int(round(float(np.nanmedian(midi_seg))))
+    cents = (midi_seg - note_int) * 100
+    return _note(start, end, note_int, np.nanmean(cents), np.nanstd(cents))
 
-        if abs(curr_midi - prev_midi) > CHANGE_THRESH:
-            if len(current) >= MIN_NOTE_FRAMES:
-                notes.append(current)
-            current = [i]
-        else:
-            current.append(i)
 
-    if current and len(current) >= MIN_NOTE_FRAMES:
-        notes.append(current)
+def segment_notes_from_pitch(pitch):
+    """
+    Segment continuous pitch into musical notes.
 
-    # Convert frame segments → note metadata
-    final_notes = []
-    hop = times[1] - times[0] if len(times) > 1 else 0.01
+    Uses tolerant thresholds to avoid splitting notes
+    during vibrato or expressive drift.
 
-    for seg in notes:
-        start = times[seg[0]]
-        end = times[seg[-1]] + hop
-        duration = end - start
+    Notes are voiced runs split at jumps above CHANGE_THRESH, found with
+    run_bounds; their statistics are computed for all notes at once.
 
-        if duration < Config.MIN_NOTE_DURATION:
-            continue
+    pitch: a PitchTrack.
+    """
+    import librosa
 
-        median_midi = float(np.nanmedian(midi[seg]))
-        note_int = int(round(median_midi))
+    times = pitch.times
+    f0 = pitch.f0
 
-        cents = (midi[seg] - note_int) * 100
+    # Convert Hz → MIDI safely (float64: note statistics sum over frames)
+    midi = librosa.hz_to_midi(np.maximum(f0, 1e-6, dtype=np.float64))
+    voiced = ~np.isnan(f0)
+    voiced[:1] = False   # segmentation starts at frame 1
 
-        final_notes.append({
-            "start": start,
-            "end": end,
-            "duration": duration,
-            "midi": note_int,
-            "note_name": _midi_to_note_name(note_int),
-            "cents_off_mean": float(np.nanmean(cents)),
-            "cents_off_std": float(np.nanstd(cents)),
-        })
+    jump = np.zeros(len(f0), dtype=bool)
+    jump[1:] = np.abs(np.diff(midi)) > CHANGE_THRESH
+    starts, ends = run_bounds(voiced, breaks=jump)
 
-    return final_notes
+    # Convert frame segments → note metadata
+    hop = pitch.frame_period
+    start_t = times[starts]
+    end_t = times[ends - 1] + hop if len(ends) else start_t
+
+    keep = (ends - starts >= MIN_NOTE_FRAMES) & (end_t - start_t >= Config.MIN_NOTE_DURATION)
+    starts, ends = starts[keep], ends[keep]
+    start_t, end_t = start_t[keep], end_t[keep]
+    if not len(starts):
+        return []
+
+    note_int = np.round(run_median(midi, starts, ends)).astype(int)
+
+    idx, run = run_indices(starts, ends)
+    cents = (midi[idx] - note_int[run]) * 100
+    lengths = ends - starts
+    mean = np.add.reduceat(cents, np.cumsum(lengths) - lengths) / lengths
+    std = np.sqrt(np.add.reduceat((cents - mean[run]) ** 2, np.cumsum(lengths) - lengths) / lengths)
+
+    return [
+        _note(start_t[k], end_t[k], int(note_int[k]), mean[k], std[k])
+        for k in range(len(starts))
+    ]
@@ -1,112 +1,134 @@
 import numpy as np
-import librosa
-import crepe
-from scipy.signal import savgol_filter
 from src.config import Config
+from src.framing import CrepeFrames
+from src.features import FeatureStore
+from src import crepe_backend
+from src.runs import run_bounds
+from src.pitch_track import PitchTrack
 
-def extract_pitch_vocal(y, sr):
+
+def _correct_jump(prev, cur, max_cents=600):
+    """
+    Correct one frame against the (already corrected) previous frame.
+    """
+    cents = abs(1200 * np.log2(cur / prev))
+    # Allow up to 600 cents (perfect 5th) between frames
+    # Larger jumps likely indicate octave errors
+    if not cents > max_cents:
+        return cur
+
+    # Check if it's an octave error
+    ratio = cur / prev
+    if 1.9 < ratio < 2.1:  # Octave up
+        return cur / 2
+    if 0.45 < ratio < 0.55:  # Octave down
+        return cur * 2
+    # Otherwise keep previous pitch
+    return prev
+
+
+def _limit_jumps(f0, max_cents=600, inplace=False):
+    """
+    Sequential jump limiter, evaluated sparsely.
+
+    A frame can only change if it jumps more than max_cents from its
+    corrected predecessor. While the predecessor is untouched that is the
+    same as the raw frame-to-frame jump, so candidates are found with one
+    array pass and only the chains that follow a correction are walked.
+    """
+    if not inplace:
+        f0 = np.copy(f0)
+    n = len(f0)
+    if n < 2:
+        return f0
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        jumps = np.abs(1200 * np.log2(f0[1:] / f0[:-1])) > max_cents
+
+    done = 0
+    for i in np.flatnonzero(jumps) + 1:
+        if i <= done:
+            continue
+        while i < n and not (np.isnan(f0[i]) or np.isnan(f0[i - 1])):
+            cur = f0[i]
+            f0[i] = _correct_jump(f0[i - 1], cur, max_cents)
+            if f0[i] == cur:
+                break
+            i += 1
+        done = i
+
+    return f0
+
+
+def _veto(f0, f0_pyin, conf):
+    """
+    FIX 3: Better pYIN veto - catch octave errors even with high confidence.
+    Unvoices (in place) frames where pYIN strongly disagrees and CREPE
+    confidence isn't very high.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cents_diff = np.abs(1200 * np.log2(f0 / f0_pyin))
+
+    # NaN in either track compares False, so those frames pass through
+    f0[(cents_diff > 120) & (conf < 0.75)] = np.nan
+    return f0
+
+
+def extract_pitch_vocal(y, sr, features=None):
     """
     FIX 1: Proper time alignment between CREPE and librosa
     FIX 2: Less aggressive jump limiting for rhythm-guided approach
+
+    RMS and CREPE read from one frame grid centered on k * hop; pYIN uses
+    the same centers. pYIN only feeds the veto, so with Config.PYIN_VETO
+    off it is not run at all.
+
+    features: optional FeatureStore for y; the frame view and RMS are
+    taken from (and left in) it.
+
+    Returns a PitchTrack. After the gate builds f0, every step edits
+    that one buffer in place.
     """
-    hop = Config.HOP_LENGTH
+    from scipy.signal import savgol_filter
 
-    # Calculate exact CREPE step size to match our hop
-    step_ms = (hop / sr) * 1000  # Convert to milliseconds
+    hop = Config.HOP_LENGTH
 
-    # RMS energy gate
-    rms = librosa.feature.rms(y=y, hop_length=hop)[0]
+    # RMS energy gate (one framing pass, shared grid)
+    features = features or FeatureStore(y, sr)
+    rms = features.rms(Config.FRAME_LENGTH, hop)
+    n = len(rms)
     rms = rms / (np.max(rms) + 1e-6)
 
-    # pYIN for range estimation
-    f0_pyin, _, _ = librosa.pyin(
-        y,
-        fmin=80,
-        fmax=1000,
-        sr=sr,
-        hop_length=hop
-    )
-
-    valid = ~np.isnan(f0_pyin)
-    if np.sum(valid) > 20:
-        fmin = max(60, np.percentile(f0_pyin[valid], 5) * 0.8)
-        fmax = min(1200, np.percentile(f0_pyin[valid], 95) * 1.2)
-    else:
-        fmin, fmax = Config.FMIN, Config.FMAX
-
-    # CREPE with ALIGNED time steps
-    print(f"Running CREPE with step_size={step_ms:.2f}ms to match hop_length={hop}")
-    _, f0_raw, conf, _ = crepe.predict(
-        y,
-        sr,
-        step_size=step_ms,  # FIX: Now aligned with librosa
-        viterbi=True,
-        model_capacity="medium"
-    )
-
-    # Align lengths
-    n = min(len(f0_raw), len(rms), len(f0_pyin))
-    f0_raw = f0_raw[:n]
-    conf = conf[:n]
-    rms = rms[:n]
-    f0_pyin = f0_pyin[:n]
+    # pYIN for the veto below
+    if Config.PYIN_VETO:
+        import librosa
+
+        f0_pyin, _, _ = librosa.pyin(y, fmin=80, fmax=1000, sr=sr, hop_length=hop)
+        f0_pyin = f0_pyin[:n]
+
+    # CREPE on frames centered on the same instants as RMS / pYIN
+    # (frames the energy gate will drop are skipped before inference)
+    active = rms > Config.RMS_GATE if Config.CREPE_SKIP_GATED else None
+    print(f"Running CREPE on {n} frames aligned to hop_length={hop}")
+    f0_raw, conf = crepe_backend.predict(CrepeFrames(y, sr, hop, n), active)
 
     # Energy + confidence gate
-    mask = (rms > 0.15) & (conf > 0.6)
+    mask = (rms > Config.RMS_GATE) & (conf > 0.6)
     f0 = np.where(mask, f0_raw, np.nan)
 
     # FIX 2: More realistic jump limiting for singing
     # Singers can jump octaves (1200 cents) easily
-    for i in range(1, len(f0)):
-        if np.isnan(f0[i]) or np.isnan(f0[i-1]):
-            continue
-
-        cents = abs(1200 * np.log2(f0[i] / f0[i-1]))
-        # Allow up to 600 cents (perfect 5th) between frames
-        # Larger jumps likely indicate octave errors
-        if cents > 600:
-            # Check if it's an octave error
-            ratio = f0[i] / f0[i-1]
-            if 1.9 < ratio < 2.1:  # Octave up
-                f0[i] = f0[i] / 2
-            elif 0.45 < ratio < 0.55:  # Octave down
-                f0[i] = f0[i] * 2
-            else:
-                # Otherwise keep previous pitch
-                f0[i] = f0[i-1]
-
-    # Segment-aware smoothing (preserve vibrato)
-    voiced = ~np.isnan(f0)
-    idx = np.where(voiced)[0]
-
-    f0_smooth = np.copy(f0)
-
-    if len(idx):
-        segments = np.split(idx, np.where(np.diff(idx) != 1)[0] + 1)
-        for seg in segments:
-            if len(seg) >= 9:
-                f0_smooth[seg] = savgol_filter(f0[seg], 9, 3)
-            else:
-                f0_smooth[seg] = np.nanmedian(f0[seg])
-
-    # FIX 3: Better pYIN veto - catch octave errors even with high confidence
-    f0_final = np.copy(f0_smooth)
-
-    for i in range(len(f0_final)):
-        if np.isnan(f0_smooth[i]) or np.isnan(f0_pyin[i]):
-            continue
-
-        cents_diff = abs(1200 * np.log2(f0_smooth[i] / f0_pyin[i]))
+    f0 = _limit_jumps(f0, inplace=True)
 
-        # Veto if pYIN strongly disagrees AND confidence isn't very high
-        if cents_diff > 120 and conf[i] < 0.75:
-            f0_final[i] = np.nan
+    # Segment-aware smoothing (preserve vibrato); runs don't overlap and
+    # each filter reads its run before writing it back
+    for a, b in zip(*run_bounds(~np.isnan(f0))):
+        if b - a >= 9:
+            f0[a:b] = savgol_filter(f0[a:b], 9, 3)
+        else:
+            f0[a:b] = np.nanmedian(f0[a:b])
 
-    times = librosa.times_like(f0_final, sr=sr, hop_length=hop)
+    if Config.PYIN_VETO:
+        f0 = _veto(f0, f0_pyin, conf)
 
-    return {
-        "times": times,
-        "pitch_smooth": f0_final,
-        "confidence": conf,
-        "pitch_pyin": f0_pyin  # Keep for debugging
-    }
\ No newline at end of file
+    return PitchTrack(f0, conf, sr, hop)
\ No newline at end of file
@@ -0,0 +1,103 @@
+import numpy as np
+
+
+class PitchTrack:
+    """
+    Frame-level pitch of one analysis.
+
+    f0 (Hz, NaN when unvoiced) and confidence are float32, voicing is
+    kept as a packed bitmask and frame times are derived from hop / sr
+    instead of stored. Slicing returns a view onto the same buffers, and
+    with_f0() swaps in a new pitch column while sharing the rest, so a
+    stage copies only the column it changes. Stages that edit pitch in
+    place do so on their own buffer before wrapping it (the bitmask is
+    built from f0 on construction).
+    """
+
+    __slots__ = ("f0", "confidence", "sr", "hop", "start", "_voiced")
+
+    def __init__(self, f0, confidence, sr, hop, start=0):
+        self.f0 = np.asarray(f0, dtype=np.float32)
+        self.confidence = np.asarray(confidence, dtype=np.float32)
+        if len(self.f0) != len(self.confidence):
+            raise ValueError(
+                f"f0 and confidence differ in length ({len(self.f0)} != {len(self.confidence)})"
+            )
+        self.sr = sr
+        self.hop = hop
+        self.start = start    # frame index of f0[0] on the analysis grid
+        self._voiced = np.packbits(~np.isnan(self.f0))
+
+    @classmethod
+    def from_result(cls, result):
+        """
+        Track over the f0 / confidence columns of a read_result() dict;
+        memory-mapped columns stay memory-mapped.
+        """
+        return cls(result["f0"], result["confidence"], result["sr"], result["hop"])
+
+    @classmethod
+    def concatenate(cls, tracks):
+        """
+        Consecutive tracks (e.g. the owned frames of analysis windows)
+        joined into one.
+        """
+        first = tracks[0]
+        return cls(
+            np.concatenate([t.f0 for t in tracks]),
+            np.concatenate([t.confidence for t in tracks]),
+            first.sr, first.hop, first.start
+        )
+
+    def __len__(self):
+        return len(self.f0)
+
+    def __getitem__(self, frames):
+        """
+        Frames [a:b] as a view sharing this track's buffers.
+        """
+        if not isinstance(frames, slice):
+            raise TypeError("PitchTrack only supports slicing")
+        a, b, step = frames.indices(len(self))
+        if step != 1:
+            raise ValueError("PitchTrack slices must be contiguous")
+        return PitchTrack(
+            self.f0[a:b], self.confidence[a:b], self.sr, self.hop, self.start + a
+        )
+
+    @property
+    def frame_period(self):
+        return self.hop / self.sr
+
+    @property
+    def times(self):
+        """Frame centers in seconds (computed on access)."""
+        return (self.start + np.arange(len(self))) * self.frame_period
+
+    @property
+    def voiced(self):
+        return np.unpackbits(self._voiced, count=len(self)).astype(bool)
+
+    @property
+    def voiced_bits(self):
+        """Voicing as np.packbits, the layout of the .vcr "voiced" column."""
+        return self._voiced
+
+    @property
+    def nbytes(self):
+        return self.f0.nbytes + self.confidence.nbytes + self._voiced.nbytes
+
+    def with_f0(self, f0):
+        """
+        New track with pitch column `f0`; confidence is shared, not copied.
+        """
+        return PitchTrack(f0, self.confidence, self.sr, self.hop, self.start)
+
+    def copy(self):
+        return PitchTrack(
+            self.f0.copy(), self.confidence.copy(), self.sr, self.hop, self.start
+        )
+
+    def __repr__(self):
+        return (f"PitchTrack({len(self)} frames, {len(self) * self.frame_period:.2f}s, "
+                f"{int(self.voiced.sum())} voiced)")
@@ -1,28 +1,22 @@
 import numpy as np
+from src.runs import run_bounds, run_indices
 
 
-def bridge_short_gaps(f0, max_gap_frames=12):
+def bridge_short_gaps(f0, max_gap_frames=12, inplace=False):
     """
     Hold pitch across very short unvoiced gaps (consonants),
     but do NOT interpolate (no fake slides).
-    """
-    f0 = np.copy(f0)
-    isnan = np.isnan(f0)
-
-    i = 0
-    while i < len(f0):
-        if isnan[i]:
-            j = i
-            while j < len(f0) and isnan[j]:
-                j += 1
 
-            gap = j - i
-            if gap <= max_gap_frames and i > 0 and j < len(f0):
-                f0[i:j] = f0[i - 1]
+    inplace=True edits f0 instead of a copy.
+    """
+    if not inplace:
+        f0 = np.copy(f0)
+    starts, ends = run_bounds(np.isnan(f0))
 
-            i = j
-        else:
-            i += 1
+    # Only interior gaps: the voice must be present on both sides
+    short = (ends - starts <= max_gap_frames) & (starts > 0) & (ends < len(f0))
+    idx, gap = run_indices(starts[short], ends[short])
+    f0[idx] = f0[starts[short][gap] - 1]
 
     return f0
 
@@ -32,7 +26,8 @@ def enforce_beatwise_pitch(
     f0,
     beat_times,
     max_flat_cents=80,
-    min_frames=5
+    min_frames=5,
+    inplace=False
 ):
     """
     Snap pitch to a stable value *within each beat* when appropriate.
@@ -40,47 +35,67 @@ def enforce_beatwise_pitch(
     - Preserves expressive passages
     - Does NOT invent pitch where there is silence
     - Only fills gaps when musically justified
+
+    Beat-to-frame ranges come from one searchsorted call (times and
+    beat_times are ascending), and per-beat median / cents std are
+    computed for all beats at once.
+
+    inplace=True writes the snapped pitch into f0 instead of a copy;
+    every beat's statistics are taken before anything is written.
     """
-    f0_out = np.copy(f0)
-    last_pitch = np.nan
-
-    for i in range(len(beat_times) - 1):
-        start = beat_times[i]
-        end = beat_times[i + 1]
-
-        idx = np.where((times >= start) & (times < end))[0]
-        if len(idx) < min_frames:
-            continue
-
-        segment = f0[idx]
-        valid = segment[~np.isnan(segment)]
-
-        if len(valid) > 0:
-            center = np.median(valid)
-            cents = 1200 * np.log2(valid / center)
-
-            if np.std(cents) < max_flat_cents:
-                # Stable note → snap
-                f0_out[idx] = center
-                last_pitch = center
-            else:
-                # Expressive → keep original
-                f0_out[idx] = f0[idx]
-                last_pitch = np.nanmedian(valid)
-
-        else:
-            # Possible held note across beat boundary
-            if not np.isnan(last_pitch):
-                # Look ahead: does pitch resume nearby?
-                next_pitch = None
-                for j in idx:
-                    if j + 1 < len(f0) and not np.isnan(f0[j + 1]):
-                        next_pitch = f0[j + 1]
-                        break
-
-                if next_pitch is not None:
-                    cents = abs(1200 * np.log2(next_pitch / last_pitch))
-                    if cents < 200:
-                        f0_out[idx] = last_pitch
+    f0_out = f0 if inplace else np.copy(f0)
+    n_beats = len(beat_times) - 1
+    if n_beats <= 0 or len(f0) == 0:
+        return f0_out
+
+    beat_times = np.asarray(beat_times)
+    lo = np.searchsorted(times, beat_times[:-1], side="left")
+    hi = np.maximum(np.searchsorted(times, beat_times[1:], side="left"), lo)
+    length = hi - lo
+    used = length >= min_frames
+
+    # Valid frames of every used beat, grouped by beat and sorted by value
+    beat_of = np.repeat(np.arange(n_beats), length)
+    frames = np.arange(lo[0], hi[-1])[used[beat_of]]
+    beat_of = beat_of[used[beat_of]]
+    keep = ~np.isnan(f0[frames])
+    vals, seg = f0[frames][keep], beat_of[keep]
+    order = np.lexsort((vals, seg))
+    vals, seg = vals[order], seg[order]
+
+    count = np.bincount(seg, minlength=n_beats)
+    has_valid = count > 0
+    first = np.concatenate([[0], np.cumsum(count)[:-1]])
+
+    center = np.full(n_beats, np.nan)
+    b = np.flatnonzero(has_valid)
+    center[b] = (vals[first[b] + (count[b] - 1) // 2] + vals[first[b] + count[b] // 2]) / 2
+
+    cents = 1200 * np.log2(vals / center[seg])
+    mean = np.bincount(seg, cents, minlength=n_beats)[b] / count[b]
+    var = np.bincount(seg, (cents - mean.repeat(count[b])) ** 2, minlength=n_beats)[b] / count[b]
+
+    # Stable note → snap; expressive → keep original
+    stable = b[np.sqrt(var) < max_flat_cents]
+    fill = np.full(n_beats, np.nan)
+    fill[stable] = center[stable]
+
+    # Possible held note across beat boundary: carry the last beat's pitch
+    # if the pitch right after this silent beat resumes near it
+    idx = np.arange(n_beats)
+    last = np.maximum.accumulate(np.where(has_valid, idx, -1))
+    prev = np.concatenate([[-1], last[:-1]])
+    last_pitch = np.where(prev >= 0, center[np.maximum(prev, 0)], np.nan)
+
+    silent = used & ~has_valid & (length > 0) & (hi < len(f0)) & ~np.isnan(last_pitch)
+    nxt = f0[np.minimum(hi, len(f0) - 1)]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        held = silent & (np.abs(1200 * np.log2(nxt / last_pitch)) < 200)
+    fill[held] = last_pitch[held]
+
+    per_frame = np.repeat(fill, length)
+    span = np.arange(lo[0], hi[-1])
+    mask = ~np.isnan(per_frame)
+    f0_out[span[mask]] = per_frame[mask]
 
     return f0_out
@@ -0,0 +1,135 @@
+"""
+Versioned binary analysis result (.vcr).
+
+Layout: 8-byte magic, uint32 header length, a JSON header, then
+little-endian columns, each starting on a 64-byte boundary so they can
+be viewed straight out of a memory map. Frame times are not stored;
+they are k * hop / sr.
+
+Columns (version 1):
+    f0, confidence        float32 per frame (f0 is NaN when unvoiced)
+    voiced                bitmask, np.packbits of the voiced frames
+    beats                 float64 seconds
+    note_start, note_end  float64 seconds
+    note_midi             int16
+    note_cents_mean/std   float32
+"""
+
+import json
+import os
+import numpy as np
+
+MAGIC = b"VCRESULT"
+VERSION = 1
+MEDIA_TYPE = "application/vnd.voicecoach.result"
+_ALIGN = 64
+
+
+def _align(n):
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def _columns(pitch, beats, notes):
+    return {
+        "f0": np.asarray(pitch.f0, dtype="<f4"),
+        "confidence": np.asarray(pitch.confidence, dtype="<f4"),
+        "voiced": pitch.voiced_bits,
+        "beats": np.asarray(beats, dtype="<f8"),
+        "note_start": np.array([n["start"] for n in notes], dtype="<f8"),
+        "note_end": np.array([n["end"] for n in notes], dtype="<f8"),
+        "note_midi": np.array([n["midi"] for n in notes], dtype="<i2"),
+        "note_cents_mean": np.array([n["cents_off_mean"] for n in notes], dtype="<f4"),
+        "note_cents_std": np.array([n["cents_off_std"] for n in notes], dtype="<f4"),
+    }
+
+
+def write_result(path, pitch, beats, notes, tempo):
+    """
+    Write the PitchTrack, beats and notes of one analysis to `path`.
+    """
+    sr, hop = pitch.sr, pitch.hop
+    columns = _columns(pitch, beats, notes)
+
+    layout, offset = {}, 0
+    for name, col in columns.items():
+        layout[name] = [col.dtype.str, offset, len(col)]
+        offset = _align(offset + col.nbytes)
+
+    header = json.dumps({
+        "version": VERSION,
+        "sr": int(sr),
+        "hop": int(hop),
+        "n_frames": len(columns["f0"]),
+        "tempo": float(tempo),
+        "columns": layout,
+    }).encode()
+    data_start = _align(len(MAGIC) + 4 + len(header))
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint32(len(header)).astype("<u4").tobytes())
+        f.write(header)
+        for name, col in columns.items():
+            f.seek(data_start + layout[name][1])
+            f.write(col.tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+def _parse(buf):
+    if bytes(buf[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a VoiceCoach result file")
+
+    pos = len(MAGIC)
+    size = int(buf[pos:pos + 4].view("<u4")[0])
+    header = json.loads(bytes(buf[pos + 4:pos + 4 + size]))
+    if header["version"] > VERSION:
+        raise ValueError(f"Unsupported result version {header['version']}")
+    data_start = _align(pos + 4 + size)
+
+    cols = {}
+    for name, (dtype, offset, length) in header["columns"].items():
+        start = data_start + offset
+        nbytes = length * np.dtype(dtype).itemsize
+        cols[name] = buf[start:start + nbytes].view(dtype)
+
+    n = header["n_frames"]
+    return {
+        "version": header["version"],
+        "sr": header["sr"],
+        "hop": header["hop"],
+        "tempo": header["tempo"],
+        "times": np.arange(n) * (header["hop"] / header["sr"]),
+        "f0": cols["f0"],
+        "confidence": cols["confidence"],
+        "voiced": np.unpackbits(cols["voiced"], count=n).astype(bool),
+        "beats": cols["beats"],
+        "notes": {
+            "start": cols["note_start"],
+            "end": cols["note_end"],
+            "midi": cols["note_midi"],
+            "cents_off_mean": cols["note_cents_mean"],
+            "cents_off_std": cols["note_cents_std"],
+        },
+    }
+
+
+def read_result(path, mmap=True):
+    """
+    Load a .vcr file. With mmap=True the columns are read-only views
+    into a memory map of the file (only "times" and "voiced" are
+    materialized).
+    """
+    if mmap:
+        buf = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        buf = np.fromfile(path, dtype=np.uint8)
+    return _parse(buf)
+
+
+def loads(data):
+    """
+    Parse a result from bytes (e.g. an HTTP response body) without copying.
+    """
+    return _parse(np.frombuffer(data, dtype=np.uint8))
@@ -1,9 +1,16 @@
-import librosa
 import numpy as np
+from src.features import FeatureStore
 
-def detect_beats(y, sr, hop):
+def detect_beats(y, sr, hop, features=None):
+    """
+    features: optional FeatureStore for y, so the onset envelope (and
+    the STFT under it) is shared with the other stages.
+    """
+    import librosa
+
+    features = features or FeatureStore(y, sr)
     tempo, beats = librosa.beat.beat_track(
-        y=y,
+        onset_envelope=features.onset_envelope(hop),
         sr=sr,
         hop_length=hop,
         start_bpm=120,
@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def run_bounds(mask, breaks=None):
+    """
+    Start and end (exclusive) indices of the runs of True in a 1-D mask.
+
+    breaks: optional boolean array; a run is also split before every
+    index where it is True (e.g. a pitch jump inside a voiced stretch).
+    """
+    mask = np.asarray(mask, dtype=bool)
+    n = len(mask)
+    prev = np.concatenate([[False], mask[:-1]])
+
+    start = mask & ~prev
+    if breaks is not None:
+        start |= mask & breaks
+    starts = np.flatnonzero(start)
+
+    # A run ends at the next run start or at the next False, whichever is first
+    off = np.append(np.flatnonzero(~mask), n)
+    next_off = off[np.searchsorted(off, starts)]
+    next_start = np.append(starts[1:], n)
+    return starts, np.minimum(next_off, next_start)
+
+
+def run_indices(starts, ends):
+    """
+    Concatenated frame indices of all runs, and the run each belongs to.
+    """
+    lengths = ends - starts
+    run = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) - offsets[run] + starts[run], run
+
+
+def run_median(values, starts, ends):
+    """
+    Median of values[s:e] for every run, without a Python loop.
+    """
+    idx, run = run_indices(starts, ends)
+    v = values[idx]
+    order = np.lexsort((v, run))
+    v = v[order]
+
+    lengths = ends - starts
+    first = np.cumsum(lengths) - lengths
+    return (v[first + (lengths - 1) // 2] + v[first + lengths // 2]) / 2
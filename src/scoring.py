@@ -0,0 +1,451 @@
+"""
+Score sung takes against a reference performance.
+
+References are analysis results (.vcr, see src/result_io.py) kept in a
+ReferenceIndex. A take is aligned to the reference with multiscale
+banded DTW: full DTW on a contour decimated to SCORE_COARSE_FRAMES,
+then at each finer level only a band around the projected coarse path
+is evaluated (SCORE_RADIUS frames either side at full resolution,
+SCORE_COARSE_RADIUS above it). Each take keeps its own band. Many takes
+are aligned together, one reference row at a time, and each row is a
+vectorized min-plus scan; takes are batched by band width.
+
+    python -m src.scoring reference.vcr take1.vcr take2.vcr ...
+"""
+import os, shutil, sys, threading
+import numpy as np
+from src.config import Config
+from src.result_io import read_result
+from src.pitch_track import PitchTrack
+
+
+def hz_to_midi(f0):
+    f0 = np.asarray(f0, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(f0 > 0, 69 + 12 * np.log2(f0 / 440.0), np.nan)
+
+
+def _decimate(x, f):
+    """
+    Merge blocks of f frames along the last axis: mean of the voiced
+    frames, NaN if fewer than half of the block is voiced.
+    """
+    m = x.shape[-1]
+    pad = -m % f
+    x = np.pad(x, [(0, 0)] * (x.ndim - 1) + [(0, pad)], constant_values=np.nan)
+    blocks = x.reshape(x.shape[:-1] + (-1, f))
+
+    voiced = ~np.isnan(blocks)
+    count = voiced.sum(axis=-1)
+    total = np.where(voiced, blocks, 0).sum(axis=-1)
+    return np.where(2 * count >= f, total / np.maximum(count, 1), np.nan)
+
+
+def _cost(ref, take):
+    """Frame distance in semitones (capped), with a flat voicing penalty."""
+    ref_nan, take_nan = np.isnan(ref), np.isnan(take)
+    with np.errstate(invalid="ignore"):
+        d = np.minimum(np.abs(take - ref), Config.SCORE_MAX_COST)
+    d = np.where(ref_nan | take_nan, Config.SCORE_UNVOICED_COST, d)
+    return np.where(ref_nan & take_nan, 0.0, d)
+
+
+class Reference:
+    """
+    A reference contour (MIDI, NaN = unvoiced), its decimation pyramid
+    and its note table in frames.
+    """
+
+    def __init__(self, name, midi, note_start, note_end, note_midi, sr, hop):
+        self.name = name
+        self.midi = midi
+        self.sr, self.hop = sr, hop
+        self.note_start, self.note_end = note_start, note_end
+        self.note_midi = note_midi
+
+        self.levels = [midi]
+        while len(self.levels[-1]) > Config.SCORE_COARSE_FRAMES:
+            self.levels.append(_decimate(self.levels[-1], Config.SCORE_DECIMATE))
+
+    @classmethod
+    def from_result(cls, name, result):
+        """Build from a read_result() dict."""
+        fps = result["sr"] / result["hop"]
+        n = len(result["f0"])
+        notes = result["notes"]
+        start = np.clip(np.round(notes["start"] * fps).astype(int), 0, n)
+        end = np.clip(np.round(notes["end"] * fps).astype(int), 0, n)
+        keep = end > start
+        return cls(
+            name, hz_to_midi(result["f0"]), start[keep], end[keep],
+            np.asarray(notes["midi"][keep], dtype=np.float64),
+            result["sr"], result["hop"]
+        )
+
+
+class ReferenceIndex:
+    """
+    Reference songs stored once as .vcr files under `root`; prepared
+    References are memoized per process.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or Config.REFERENCE_DIR
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def path(self, name):
+        if os.path.basename(name) != name or not name:
+            raise ValueError(f"Invalid reference name: {name!r}")
+        return os.path.join(self.root, f"{name}.vcr")
+
+    def names(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(f[:-4] for f in os.listdir(self.root) if f.endswith(".vcr"))
+
+    def add(self, name, result_path):
+        """Register an analysis result as reference `name`."""
+        read_result(result_path)   # validates the file
+        os.makedirs(self.root, exist_ok=True)
+        shutil.copyfile(result_path, self.path(name))
+        with self._lock:
+            self._loaded.pop(name, None)
+
+    def get(self, name):
+        with self._lock:
+            if name not in self._loaded:
+                path = self.path(name)
+                if not os.path.exists(path):
+                    raise KeyError(name)
+                self._loaded[name] = Reference.from_result(name, read_result(path))
+            return self._loaded[name]
+
+
+def _segments(width, T, n):
+    """
+    Flat layout of a band: one segment per (row, take), row after row.
+    Returns the segment widths and start offsets, both (n, T).
+    """
+    seg_w = np.ascontiguousarray(np.broadcast_to(np.asarray(width, dtype=int), (T, n)).T)
+    return seg_w, np.cumsum(seg_w).reshape(n, T) - seg_w
+
+
+def _dtw_band(ref, takes, m, lo, width, chunk=64):
+    """
+    DTW of every take against ref, restricted to columns
+    lo[t, i] .. lo[t, i] + width[t, i] of each row i (width may also be
+    one int for all rows). A row's band must not start past the column
+    after the previous row's band, which full bands and _band() satisfy.
+
+    The horizontal recurrence D[j] = min(t[j], D[j-1] + c[j]) is a
+    min-plus prefix scan: D = minimum.accumulate(t - C) + C with C the
+    running sum of the row costs. The takes' bands of a row are laid end
+    to end and scanned in one call, each shifted below everything before
+    it so the scan restarts there. Costs, running sums and gather indices
+    are prepared `chunk` rows at a time.
+
+    Returns the step codes (0 diagonal, 1 up, 2 left) in the _segments()
+    layout and the total cost of each take's path.
+    """
+    T, M = takes.shape
+    n = len(ref)
+    seg_w, seg_off = _segments(width, T, n)
+    row_off = np.append(seg_off[:, 0], seg_off[-1, -1] + seg_w[-1, -1])
+    steps = np.empty(row_off[-1], dtype=np.int8)
+    seg_lo = lo.T
+
+    # Where each segment's row-above band sits in the previous row's
+    # buffer, which ends with one inf for out-of-band cells. Row 0
+    # continues from a virtual start cell (0, -1): buffer [0, inf].
+    p_w = np.vstack([np.ones((1, T), dtype=int), seg_w[:-1]])
+    p_lo = np.vstack([np.full((1, T), -1), seg_lo[:-1]])
+    p_start = np.vstack([np.zeros((1, T), dtype=int), seg_off[:-1] - row_off[:-2, None]])
+    p_end = np.append(1, np.diff(row_off)[:-1])
+    prev = np.array([0.0, np.inf])
+
+    for i0 in range(0, n, chunk):
+        i1 = min(i0 + chunk, n)
+        w = seg_w[i0:i1].ravel()
+        take = np.tile(np.arange(T), i1 - i0)
+        start = np.cumsum(w) - w
+        a = np.arange(row_off[i1] - row_off[i0]) - np.repeat(start, w)
+
+        col = np.repeat(seg_lo[i0:i1].ravel(), w) + a
+        cost = _cost(
+            np.repeat(ref[i0:i1], seg_w[i0:i1].sum(axis=1)),
+            takes.ravel()[np.repeat(take * M, w) + np.minimum(col, M - 1)]
+        )
+
+        # Running sums within each segment
+        C = np.cumsum(cost)
+        C -= np.repeat(C[start] - cost[start], w)
+
+        # Column j of row i sits at k = j - lo[i-1] in the band above
+        k = np.repeat((seg_lo[i0:i1] - p_lo[i0:i1]).ravel(), w) + a
+        wp = np.repeat(p_w[i0:i1].ravel(), w)
+        base = np.repeat(p_start[i0:i1].ravel(), w)
+        out = np.repeat(p_end[i0:i1], seg_w[i0:i1].sum(axis=1))
+        up_idx = np.where(k < wp, base + k, out)
+        diag_idx = np.where((k >= 1) & (k <= wp), base + k - 1, out)
+
+        for i in range(i0, i1):
+            s = slice(row_off[i] - row_off[i0], row_off[i + 1] - row_off[i0])
+            c, Ci = cost[s], C[s]
+            up, diag = prev[up_idx[s]], prev[diag_idx[s]]
+            t = np.minimum(diag, up)
+            t += c
+            x = t - Ci
+
+            # Lift each segment so it starts 1 below the lowest value
+            # of the segments before it
+            wi = seg_w[i]
+            starts = seg_off[i] - row_off[i]
+            x0 = x[starts]
+            drop = x0 - np.minimum.reduceat(x, starts) + 1
+            lift = np.repeat(x0 + np.cumsum(drop) - drop, wi)
+            x -= lift
+            D = np.minimum.accumulate(x)
+            D += lift
+            D += Ci
+
+            code = steps[row_off[i]:row_off[i + 1]]
+            np.less(up, diag, out=code, casting="unsafe")
+            left = D[:-1] + c[1:] < t[1:]
+            left[starts[1:] - 1] = False
+            np.copyto(code[1:], 2, where=left)
+
+            prev = np.empty(len(D) + 1)
+            prev[:-1] = D
+            prev[-1] = np.inf
+
+    end = prev[seg_off[-1] - row_off[-2] + m - 1 - lo[:, -1]]
+    return steps, end
+
+
+def _backtrack(steps, lo, width, m):
+    """
+    Walk all paths back from (n-1, m-1) at once. Returns the first and
+    last take frame aligned to each reference row, and the path lengths.
+    """
+    T, n = lo.shape
+    _, seg_off = _segments(width, T, n)
+    takes = np.arange(T)
+    i = np.full(T, n - 1)
+    j = m - 1
+    jmin = np.zeros((T, n), dtype=int)
+    jmax = np.zeros((T, n), dtype=int)
+    jmin[takes, i] = jmax[takes, i] = j
+    length = np.ones(T, dtype=int)
+
+    active = (i > 0) | (j > 0)
+    while active.any():
+        a = takes[active]
+        ia, ja = i[a], j[a]
+        code = steps[seg_off[ia, a] + ja - lo[a, ia]]
+        ia = ia - (code != 2)
+        ja = ja - (code != 1)
+
+        moved = code != 2
+        jmax[a[moved], ia[moved]] = ja[moved]
+        jmin[a, ia] = ja
+        i[a], j[a] = ia, ja
+        length[a] += 1
+        active = (i > 0) | (j > 0)
+
+    return jmin, jmax, length
+
+
+def _band(jmin, jmax, n, m, f, radius):
+    """
+    Band of a finer level around the coarse path (jmin, jmax): the
+    projected path cells widened by `radius` frames in both directions.
+    The projected columns never decrease with the row, so the window
+    min / max over rows i - radius .. i + radius is just its end value.
+    """
+    nc = jmin.shape[1]
+    rows = np.arange(n)
+    lo = jmin[:, np.minimum(np.maximum(rows - radius, 0) // f, nc - 1)] * f - radius
+    hi = (jmax[:, np.minimum((rows + radius) // f, nc - 1)] + 1) * f + radius
+    return np.maximum(lo, 0), np.minimum(hi, m[:, None])
+
+
+def _pyramid(ref, takes, m):
+    """Decimation pyramid of takes (T, M, NaN padded) and the lengths per level."""
+    f = Config.SCORE_DECIMATE
+    pyramid, lengths = [takes], [m]
+    for _ in ref.levels[1:]:
+        pyramid.append(_decimate(pyramid[-1], f))
+        lengths.append(-(-lengths[-1] // f))
+    return pyramid, lengths
+
+
+def _top_path(ref, pyramid, lengths):
+    """Full DTW at the coarsest level."""
+    k = len(ref.levels) - 1
+    lo = np.zeros((len(lengths[k]), len(ref.levels[k])), dtype=int)
+    width = int(lengths[k].max())
+    steps, cost = _dtw_band(ref.levels[k], pyramid[k], lengths[k], lo, width)
+    jmin, jmax, length = _backtrack(steps, lo, width, lengths[k])
+    return jmin, jmax, cost, length
+
+
+def _radius(k):
+    """Band radius at pyramid level k."""
+    return Config.SCORE_RADIUS if k == 0 else Config.SCORE_COARSE_RADIUS
+
+
+def _align(ref, takes, m, coarse=None):
+    """
+    Multiscale banded DTW of takes (T, M, NaN padded) against a Reference.
+    coarse: (jmin, jmax) of the coarsest level if already known.
+    """
+    pyramid, lengths = _pyramid(ref, takes, m)
+    top = len(ref.levels) - 1
+    if coarse is None or top == 0:
+        jmin, jmax, cost, length = _top_path(ref, pyramid, lengths)
+    else:
+        jmin, jmax = coarse
+
+    for k in range(top - 1, -1, -1):
+        lo, hi = _band(jmin, jmax, len(ref.levels[k]), lengths[k],
+                       Config.SCORE_DECIMATE, _radius(k))
+        width = hi - lo
+        steps, cost = _dtw_band(ref.levels[k], pyramid[k], lengths[k], lo, width)
+        jmin, jmax, length = _backtrack(steps, lo, width, lengths[k])
+        del steps
+
+    return jmin, jmax, cost, length
+
+
+def _pad(takes):
+    m = np.array([len(x) for x in takes])
+    padded = np.full((len(takes), m.max()), np.nan)
+    for t, midi in enumerate(takes):
+        padded[t, :len(midi)] = midi
+    return padded, m
+
+
+def _octave_shift(ref, midi):
+    """Whole octaves that bring the take's median pitch nearest the reference's."""
+    if not Config.SCORE_OCTAVE_INVARIANT or np.all(np.isnan(midi)) or np.all(np.isnan(ref.midi)):
+        return 0
+    return 12 * int(round((np.nanmedian(ref.midi) - np.nanmedian(midi)) / 12))
+
+
+def _score_batch(ref, takes, shifts, coarse=None):
+    padded, m = _pad(takes)
+    jmin, jmax, cost, length = _align(ref, padded, m, coarse)
+
+    # Take pitch aligned to each reference frame
+    aligned = np.take_along_axis(padded, (jmin + jmax) // 2, axis=1)
+    tol = Config.SCORE_TOLERANCE_CENTS / 100
+    with np.errstate(invalid="ignore"):
+        in_tune = np.abs(aligned - ref.midi) <= tol
+    ref_voiced = ~np.isnan(ref.midi)
+
+    # Mean aligned pitch over each reference note
+    sung = ~np.isnan(aligned)
+    total = np.concatenate([np.zeros((len(takes), 1)), np.cumsum(np.where(sung, aligned, 0), axis=1)], axis=1)
+    count = np.concatenate([np.zeros((len(takes), 1)), np.cumsum(sung, axis=1)], axis=1)
+    n_sung = count[:, ref.note_end] - count[:, ref.note_start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        note_pitch = (total[:, ref.note_end] - total[:, ref.note_start]) / n_sung
+        cents = (note_pitch - ref.note_midi) * 100
+    hit = np.abs(np.nan_to_num(cents, nan=np.inf)) <= Config.SCORE_TOLERANCE_CENTS
+
+    scores = []
+    for t in range(len(takes)):
+        scores.append({
+            "distance": float(cost[t] / length[t]),
+            "pitch_accuracy": float(in_tune[t, ref_voiced].mean()) if ref_voiced.any() else 0.0,
+            "note_accuracy": float(hit[t].mean()) if len(ref.note_midi) else 0.0,
+            "octave_shift": int(shifts[t]),
+            "notes": [
+                {
+                    "midi": int(ref.note_midi[k]),
+                    "sung_midi": None if np.isnan(note_pitch[t, k]) else round(float(note_pitch[t, k]), 2),
+                    "cents_error": None if np.isnan(cents[t, k]) else round(float(cents[t, k]), 1),
+                    "hit": bool(hit[t, k]),
+                }
+                for k in range(len(ref.note_midi))
+            ],
+        })
+    return scores
+
+
+def _take_midi(take, ref):
+    if isinstance(take, str):
+        result = read_result(take)
+        if (result["sr"], result["hop"]) != (ref.sr, ref.hop):
+            raise ValueError(f"{take}: frame rate differs from reference {ref.name}")
+        take = result["f0"]
+    elif isinstance(take, PitchTrack):
+        if (take.sr, take.hop) != (ref.sr, ref.hop):
+            raise ValueError(f"Take frame rate differs from reference {ref.name}")
+        take = take.f0
+    return hz_to_midi(take)
+
+
+def score_takes(reference, takes, batch_size=None):
+    """
+    Score many takes against one Reference.
+
+    takes: PitchTracks, f0 arrays in Hz on the reference's frame grid
+    or paths to .vcr results. Returns one score dict per
+    take, or None for an empty take.
+    """
+    batch_size = batch_size or Config.SCORE_BATCH
+    midi = [_take_midi(take, reference) for take in takes]
+    shifts = [_octave_shift(reference, x) for x in midi]
+    midi = [x + s for x, s in zip(midi, shifts)]
+    scores = [None] * len(midi)
+
+    order = [k for k in np.argsort([len(x) for x in midi]) if len(midi[k])]
+    coarse = None
+    if len(order) > batch_size and len(reference.levels) > 1:
+        # A row's band is as wide as its widest take, so align takes whose
+        # coarse paths need similar bands together: run the (cheap) top
+        # level for every take, then batch by band area at the next level
+        top = len(reference.levels) - 1
+        n = len(reference.levels[top - 1])
+        jmin = np.zeros((len(midi), len(reference.levels[top])), dtype=int)
+        jmax = np.zeros_like(jmin)
+        area = np.zeros(len(midi))
+        for b in range(0, len(order), batch_size):
+            batch = order[b:b + batch_size]
+            pyramid, lengths = _pyramid(reference, *_pad([midi[k] for k in batch]))
+            jmin[batch], jmax[batch], _, _ = _top_path(reference, pyramid, lengths)
+            lo, hi = _band(jmin[batch], jmax[batch], n, lengths[top - 1],
+                           Config.SCORE_DECIMATE, _radius(top - 1))
+            area[batch] = (hi - lo).sum(axis=1)
+        order = sorted(order, key=lambda k: area[k])
+        coarse = jmin, jmax
+
+    for b in range(0, len(order), batch_size):
+        batch = order[b:b + batch_size]
+        batch_coarse = None if coarse is None else (coarse[0][batch], coarse[1][batch])
+        batch_scores = _score_batch(
+            reference, [midi[k] for k in batch], [shifts[k] for k in batch], batch_coarse
+        )
+        for k, score in zip(batch, batch_scores):
+            scores[k] = score
+    return scores
+
+
+def score_take(reference, take):
+    return score_takes(reference, [take])[0]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python -m src.scoring <reference.vcr> <take.vcr> [...]")
+        sys.exit(1)
+
+    ref = Reference.from_result("reference", read_result(sys.argv[1]))
+    for path, score in zip(sys.argv[2:], score_takes(ref, sys.argv[2:])):
+        if score is None:
+            print(f"{path}: empty take")
+            continue
+        print(f"{path}: distance={score['distance']:.3f} "
+              f"pitch={score['pitch_accuracy']:.1%} notes={score['note_accuracy']:.1%}")
@@ -1,19 +1,215 @@
-import subprocess, os, librosa, soundfile as sf
+import multiprocessing, subprocess, os, tempfile, threading
+import numpy as np
+import soundfile as sf
+from src.config import Config
 
-def separate_vocals_demucs(input_path, workdir="outputs"):
-    os.makedirs(workdir, exist_ok=True)
-    temp_wav = os.path.join(workdir, "input.wav")
+_model = None
+_model_lock = threading.Lock()
+
+# Set in each forked segment worker by _init_segment_worker
+_segment_input = None
+
+
+def _get_model():
+    """
+    Load the Demucs model once per process and keep it resident.
+    """
+    global _model
+    with _model_lock:
+        if _model is None:
+            import torch
+            from demucs.pretrained import get_model
+
+            if Config.SEPARATION_THREADS:
+                torch.set_num_threads(Config.SEPARATION_THREADS)
+
+            model = get_model(Config.SEPARATION_MODEL)
+            model.eval()
+            _model = model
+            print(f"Loaded Demucs model '{Config.SEPARATION_MODEL}'")
+    return _model
+
+
+def separate(y, sr, workdir="outputs"):
+    """
+    Separate vocals from a (channels, samples) or mono buffer at
+    Config.SEPARATION_SR. Returns (vocal, sr) with a mono vocal stem.
+    """
+    if Config.SEPARATION_BACKEND == "inprocess":
+        try:
+            return separate_vocals(y, sr)
+        except ImportError as e:
+            print("In-process Demucs unavailable, using CLI:", e)
+    return separate_vocals_demucs(y, sr, workdir)
+
+
+def separate_vocals(y, sr, workers=None):
+    """
+    In-process two-stem separation.
+
+    Long inputs are split into overlapping segments that run on
+    `workers` forked processes (default Config.SEPARATION_WORKERS).
+    Returns the vocal stem as a mono float32 array and its sample rate.
+    """
+    import torch
 
-    y, sr = librosa.load(input_path, sr=44100)
-    sf.write(temp_wav, y, sr)
+    model = _get_model()
+    if sr != model.samplerate:
+        raise ValueError(f"Demucs expects {model.samplerate} Hz input, got {sr}")
 
-    subprocess.run(
-        ["demucs", "--two-stems", "vocals", "-o", workdir, temp_wav],
-        check=True
+    y = np.atleast_2d(y)
+    if y.shape[0] < model.audio_channels:
+        y = np.repeat(y[:1], model.audio_channels, axis=0)
+    else:
+        y = y[:model.audio_channels]
+
+    wav = torch.from_numpy(np.ascontiguousarray(y, dtype=np.float32))
+
+    # Same normalisation the demucs CLI applies
+    ref = wav.mean(0)
+    mean, std = ref.mean(), ref.std() + 1e-8
+    wav = (wav - mean) / std
+
+    workers = _separation_workers() if workers is None else workers
+    parallel = (
+        workers > 1
+        and wav.shape[1] >= Config.SEPARATION_PARALLEL_MIN_SECONDS * sr
+        and "fork" in multiprocessing.get_all_start_methods()
     )
+    if parallel:
+        vocals = _separate_parallel(wav, sr, workers)
+    else:
+        vocals = _apply(model, wav)
+
+    return (vocals * std.item() + mean.item()).astype(np.float32), sr
+
+
+def _apply(model, wav):
+    """
+    Mono vocal stem of a normalised (channels, samples) tensor.
+    """
+    import torch
+    from demucs.apply import apply_model
+
+    with torch.no_grad():
+        sources = apply_model(
+            model,
+            wav[None],
+            split=True,
+            overlap=0.25,
+            progress=False
+        )[0]
+    return sources[model.sources.index("vocals")].mean(0).numpy()
+
+
+def _separation_workers():
+    if Config.SEPARATION_WORKERS:
+        return Config.SEPARATION_WORKERS
+    if Config.JOB_EXECUTOR == "thread":
+        # Don't fork a process running other jobs' threads (see _separate_parallel)
+        return 1
+    return max(1, (os.cpu_count() or 1) // max(1, Config.JOB_WORKERS))
+
+
+def plan_segments(n, segment, overlap):
+    """
+    (start, end) sample ranges of length `segment` that overlap by
+    `overlap`; the last one ends at n.
+    """
+    step = max(segment - overlap, 1)
+    starts = list(range(0, max(n - overlap, 1), step))
+    return [(a, min(a + segment, n)) for a in starts]
 
-    for root, _, files in os.walk(workdir):
-        if "vocals.wav" in files:
-            return os.path.join(root, "vocals.wav")
+
+def crossfade(parts, n, overlap):
+    """
+    Overlap-add (start, samples) parts with linear fades across each
+    overlap, normalised by the summed fade weights.
+    """
+    out = np.zeros(n, dtype=np.float32)
+    weight = np.zeros(n, dtype=np.float32)
+
+    for a, seg in parts:
+        b = a + len(seg)
+        w = np.ones(len(seg), dtype=np.float32)
+        r = min(overlap, len(seg) // 2)
+        if a > 0 and r:
+            w[:r] = np.linspace(0, 1, r + 2, dtype=np.float32)[1:-1]
+        if b < n and r:
+            w[-r:] = np.linspace(1, 0, r + 2, dtype=np.float32)[1:-1]
+        out[a:b] += w * seg
+        weight[a:b] += w
+
+    return out / np.maximum(weight, 1e-8)
+
+
+def _init_segment_worker(threads, wav):
+    import torch
+
+    global _segment_input
+    _segment_input = wav
+    torch.set_num_threads(threads)
+
+
+def _separate_segment(bounds):
+    a, b = bounds
+    return a, _apply(_model, _segment_input[:, a:b])
+
+
+def _separate_parallel(wav, sr, workers):
+    """
+    Segment-parallel separation on a fork pool. Workers share the
+    parent's model and input pages; only the vocal segments come back.
+
+    The input is passed as initargs, which a fork pool hands over in
+    memory rather than pickling, so concurrent separations each fork
+    with their own input. Forking a process with live threads (other
+    jobs, the CREPE batcher, TensorFlow and torch pools) can leave a
+    worker holding a lock nobody will release, so this only runs by
+    default under the process executor; with JOB_EXECUTOR = "thread" it
+    needs an explicit SEPARATION_WORKERS > 1.
+    """
+    import torch
+
+    segment = int(Config.SEPARATION_SEGMENT_SECONDS * sr)
+    overlap = int(Config.SEPARATION_OVERLAP_SECONDS * sr)
+    bounds = plan_segments(wav.shape[1], segment, overlap)
+    workers = min(workers, len(bounds))
+    threads = max(1, torch.get_num_threads() // workers)
+    print(f"Separating {len(bounds)} segments on {workers} workers")
+
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(workers, initializer=_init_segment_worker, initargs=(threads, wav)) as pool:
+        parts = pool.map(_separate_segment, bounds, chunksize=1)
+
+    return crossfade(parts, wav.shape[1], overlap)
+
+
+def separate_vocals_demucs(y, sr, workdir="outputs"):
+    """
+    Fallback: run the demucs CLI on a temporary WAV and read the stem back.
+    """
+    with tempfile.TemporaryDirectory(dir=_ensure(workdir)) as tmp:
+        temp_wav = os.path.join(tmp, "input.wav")
+        sf.write(temp_wav, np.atleast_2d(y).T, sr)
+
+        subprocess.run(
+            ["demucs", "--two-stems", "vocals", "-o", tmp, temp_wav],
+            check=True
+        )
+
+        for root, _, files in os.walk(tmp):
+            if "vocals.wav" in files:
+                vocal, vocal_sr = sf.read(
+                    os.path.join(root, "vocals.wav"),
+                    dtype="float32",
+                    always_2d=True
+                )
+                return vocal.mean(axis=1), vocal_sr
 
     raise FileNotFoundError("Demucs vocals.wav not found")
+
+
+def _ensure(workdir):
+    os.makedirs(workdir, exist_ok=True)
+    return workdir
@@ -0,0 +1,188 @@
+from collections import deque
+import numpy as np
+from src.config import Config
+from src import crepe_backend
+from src.framing import CREPE_SR, CREPE_FRAME, normalize_crepe_frames
+from src.pitch import _correct_jump
+from src.notes import make_note, CHANGE_THRESH, MIN_NOTE_FRAMES
+
+
+def _hz_to_midi(f):
+    return 12 * (np.log2(f) - np.log2(440.0)) + 69
+
+
+class StreamingPitchTracker:
+    """
+    Incremental pitch and note tracking for live input.
+
+    push() takes mono float32 blocks and returns the events for every
+    frame that became complete. Frames use the same centered grid as
+    extract_pitch_vocal, so a pitch event lags its frame center by half a
+    frame plus CREPE's window (about 50 ms at the default settings).
+
+    Offline-only steps are replaced by running state: the global RMS
+    maximum by a decaying peak, Viterbi by CREPE's local average,
+    Savitzky-Golay by a causal median, and pYIN / beat snapping are
+    skipped. Jump correction, gap bridging and note statistics reuse the
+    offline rules.
+    """
+
+    def __init__(self, sr=None, hop=None, frame_length=None):
+        self.sr = sr or Config.SAMPLE_RATE
+        self.hop = hop or Config.HOP_LENGTH
+        self.frame_length = frame_length or Config.FRAME_LENGTH
+
+        # Zero left padding matches center=True framing
+        half = self.frame_length // 2
+        self._y = np.zeros(half, dtype=np.float32)
+        self._y_start = -half
+        self._y16 = np.zeros(CREPE_FRAME // 2, dtype=np.float32)
+        self._y16_start = -(CREPE_FRAME // 2)
+        import soxr
+        self._resampler = soxr.ResampleStream(self.sr, CREPE_SR, 1, dtype="float32")
+        self._received = 0
+
+        self._k = 0
+        self._rms_peak = 0.0
+        self._prev_f0 = np.nan
+        self._run = deque(maxlen=Config.STREAM_SMOOTH_FRAMES)
+
+        self._note = []
+        self._note_start = 0
+        self._gap = 0
+        self._last_midi = np.nan
+
+    def push(self, block):
+        block = np.asarray(block, dtype=np.float32).ravel()
+        self._y = np.concatenate([self._y, block])
+        self._y16 = np.concatenate([self._y16, self._resampler.resample_chunk(block)])
+        self._received += len(block)
+        return self._process()
+
+    def flush(self):
+        """
+        Close any open note at end of stream.
+        """
+        events = []
+        self._close_note(events)
+        return events
+
+    def _ready(self, k):
+        half = self.frame_length // 2
+        c16 = int(round(k * self.hop * CREPE_SR / self.sr))
+        return (k * self.hop + half <= self._y_start + len(self._y)
+                and c16 + CREPE_FRAME // 2 <= self._y16_start + len(self._y16))
+
+    def _process(self):
+        hop, half = self.hop, self.frame_length // 2
+        ks = []
+        while self._ready(self._k + len(ks)):
+            ks.append(self._k + len(ks))
+        if not ks:
+            return []
+
+        # Energy gate with a decaying running peak instead of the global max
+        rms = np.empty(len(ks))
+        for j, k in enumerate(ks):
+            a = k * hop - half - self._y_start
+            seg = self._y[a:a + self.frame_length]
+            rms[j] = np.sqrt(np.mean(seg * seg))
+        norm = np.empty(len(ks))
+        for j, r in enumerate(rms):
+            self._rms_peak = max(r, self._rms_peak * Config.STREAM_RMS_DECAY)
+            norm[j] = r / (self._rms_peak + 1e-6)
+
+        # CREPE only on frames that pass the energy gate
+        active = norm > Config.RMS_GATE
+        f0_raw = np.zeros(len(ks))
+        conf = np.zeros(len(ks), dtype=np.float32)
+        if active.any():
+            starts = [
+                int(round(k * hop * CREPE_SR / self.sr)) - CREPE_FRAME // 2 - self._y16_start
+                for k in np.asarray(ks)[active]
+            ]
+            frames = normalize_crepe_frames(
+                np.stack([self._y16[s:s + CREPE_FRAME] for s in starts])
+            )
+            f0_raw[active], conf[active] = crepe_backend.predict_local(frames)
+
+        events = []
+        for j, k in enumerate(ks):
+            f = f0_raw[j] if active[j] and conf[j] > 0.6 else np.nan
+
+            if not (np.isnan(f) or np.isnan(self._prev_f0)):
+                f = _correct_jump(self._prev_f0, f)
+            self._prev_f0 = f
+
+            if np.isnan(f):
+                self._run.clear()
+                smooth = np.nan
+            else:
+                self._run.append(f)
+                smooth = float(np.median(self._run))
+
+            t = k * hop / self.sr
+            events.append({
+                "type": "pitch",
+                "time": t,
+                "f0": None if np.isnan(smooth) else smooth,
+                "confidence": float(conf[j]),
+                "latency": self._received / self.sr - t,
+            })
+            self._note_step(k, smooth, events)
+
+        self._k = ks[-1] + 1
+
+        # Drop samples no future frame needs
+        keep = self._k * hop - half - self._y_start
+        self._y = self._y[keep:]
+        self._y_start += keep
+        keep16 = int(round(self._k * hop * CREPE_SR / self.sr)) - CREPE_FRAME // 2 - self._y16_start
+        self._y16 = self._y16[max(keep16, 0):]
+        self._y16_start += max(keep16, 0)
+
+        return events
+
+    def _note_step(self, k, f, events):
+        """
+        Incremental segment_notes_from_pitch with bridge_short_gaps folded
+        in: a gap of up to MAX_GAP_FRAMES holds the previous pitch if the
+        voice resumes.
+        """
+        if np.isnan(f):
+            if self._note:
+                self._gap += 1
+                if self._gap > Config.MAX_GAP_FRAMES:
+                    self._close_note(events)
+            return
+
+        midi = float(_hz_to_midi(f))
+
+        if self._note and self._gap:
+            self._note.extend([self._last_midi] * self._gap)
+        self._gap = 0
+
+        if self._note and abs(midi - self._last_midi) > CHANGE_THRESH:
+            self._close_note(events)
+
+        if not self._note:
+            self._note_start = k
+        self._note.append(midi)
+        self._last_midi = midi
+
+        if len(self._note) == MIN_NOTE_FRAMES:
+            events.append({
+                "type": "note_on",
+                "time": self._note_start * self.hop / self.sr,
+                "midi": int(round(midi)),
+            })
+
+    def _close_note(self, events):
+        if len(self._note) >= MIN_NOTE_FRAMES:
+            start = self._note_start * self.hop / self.sr
+            end = (self._note_start + len(self._note)) * self.hop / self.sr
+            note = make_note(start, end, np.asarray(self._note))
+            if note is not None:
+                events.append(dict(note, type="note"))
+        self._note = []
+        self._gap = 0
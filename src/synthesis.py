@@ -1,15 +1,126 @@
 import numpy as np
 
-def resynthesize_f0(f0, sr, hop, amp=0.3):
-    y = np.zeros(len(f0) * hop, dtype=np.float32)
-    phase = 0.0
 
-    for i, f in enumerate(f0):
-        if np.isnan(f) or f <= 0:
-            phase = 0
-            continue
-        t = np.arange(hop) / sr
-        y[i*hop:(i+1)*hop] = amp * np.sin(2*np.pi*f*t + phase)
-        phase += 2*np.pi*f*hop/sr
-        phase %= 2*np.pi
+def _runs(f0):
+    """
+    Voiced mask plus, for every frame, the first and last frame of the
+    voiced run containing it.
+    """
+    with np.errstate(invalid="ignore"):
+        voiced = ~np.isnan(f0) & (f0 > 0)
+    n = len(f0)
+    idx = np.arange(n)
+
+    starts = voiced & ~np.concatenate([[False], voiced[:-1]])
+    ends = voiced & ~np.concatenate([voiced[1:], [False]])
+    run_start = np.maximum.accumulate(np.where(starts, idx, 0))
+    run_end = np.minimum.accumulate(np.where(ends, idx, n - 1)[::-1])[::-1]
+    return voiced, run_start, run_end
+
+
+def _check_harmonics(harmonics):
+    if not sum(abs(x) for x in harmonics):
+        raise ValueError("harmonics needs at least one non-zero weight")
+
+
+def _render(f0, runs, sr, hop, a, b, phase0,
+            amp, harmonics, envelope, fade):
+    """
+    Render frames [a, b) and return (samples, phase after frame b - 1).
+
+    Works on a (frames, hop) grid: frequency is interpolated linearly
+    between frame centers inside each voiced run, and phase is a
+    cumulative sum that restarts at 0 at the start of every run (runs
+    always begin on a frame boundary).
+    """
+    voiced, run_start, run_end = runs
+    n = b - a
+    if n <= 0 or not voiced[a:b].any():
+        return np.zeros(n * hop, dtype=np.float32), 0.0
+
+    j = np.arange(a, b)
+    v = voiced[a:b]
+    rs, re = run_start[a:b], run_end[a:b]
+    f = np.where(voiced, f0, 0)
+    fj = f[j]
+
+    # Slopes toward the neighbouring frame centers, zero at run edges
+    fwd = np.where(j < re, f[np.minimum(j + 1, len(f) - 1)] - fj, 0)
+    bwd = np.where(j > rs, fj - f[np.maximum(j - 1, 0)], 0)
+    d = (np.arange(hop) + 0.5) / hop - 0.5
+    half = hop // 2
+    freq = np.empty((n, hop))
+    freq[:, :half] = fj[:, None] + d[:half] * bwd[:, None]
+    freq[:, half:] = fj[:, None] + d[half:] * fwd[:, None]
+    freq[~v] = 0
+
+    omega = 2 * np.pi * freq / sr
+    within = np.cumsum(omega, axis=1) - omega
+    total = within[:, -1] + omega[:, -1]
+
+    # Phase at each frame start, restarting at 0 where a run begins
+    cs = np.cumsum(total) - total + phase0
+    first = v & (j == rs)
+    last = np.maximum.accumulate(np.where(first, np.arange(n), -1))
+    start = cs - np.where(last >= 0, cs[np.maximum(last, 0)], 0)
+    phase = start[:, None] + within
+    phase_end = float((start[-1] + total[-1]) % (2 * np.pi)) if v[-1] else 0.0
+
+    y = np.zeros((n, hop))
+    for h, amp_h in enumerate(harmonics, start=1):
+        if amp_h:
+            y += amp_h * np.sin(h * phase) * (h * freq < sr / 2)
+    y *= amp / sum(abs(x) for x in harmonics)
+
+    if fade:
+        # Short ramps at run edges instead of hard on/off clicks
+        edge = v & (np.minimum(j - rs, re - j) * hop < fade)
+        o = np.arange(hop)
+        dist = np.minimum(((j - rs) * hop)[edge, None] + o,
+                          ((re - j) * hop)[edge, None] + hop - 1 - o)
+        y[edge] *= np.clip((dist + 1) / fade, 0, 1)
+
+    if envelope is not None:
+        g = np.asarray(envelope, dtype=np.float64)
+        gj = g[j]
+        gn = g[np.minimum(j + 1, len(g) - 1)] - gj
+        gp = gj - g[np.maximum(j - 1, 0)]
+        y[:, :half] *= gj[:, None] + d[:half] * gp[:, None]
+        y[:, half:] *= gj[:, None] + d[half:] * gn[:, None]
+
+    y[~v] = 0
+    return y.astype(np.float32).ravel(), phase_end
+
+
+def resynthesize_f0(f0, sr, hop, amp=0.3, harmonics=(1.0,), envelope=None, fade_ms=5):
+    """
+    Phase-continuous oscillator driven by a frame-rate f0 track.
+
+    harmonics: relative amplitudes of partials 1, 2, ... (above-Nyquist
+    partials are dropped). envelope: optional per-frame gain.
+    """
+    _check_harmonics(harmonics)
+    f0 = np.asarray(f0, dtype=np.float64)
+    fade = int(sr * fade_ms / 1000)
+    y, _ = _render(f0, _runs(f0), sr, hop, 0, len(f0), 0.0,
+                   amp, harmonics, envelope, fade)
     return y
+
+
+def iter_resynthesize_f0(f0, sr, hop, block_frames=4096, amp=0.3,
+                         harmonics=(1.0,), envelope=None, fade_ms=5):
+    """
+    Same output as resynthesize_f0, yielded in blocks of block_frames * hop
+    samples with phase carried across block boundaries.
+    """
+    _check_harmonics(harmonics)
+    f0 = np.asarray(f0, dtype=np.float64)
+    fade = int(sr * fade_ms / 1000)
+    runs = _runs(f0)
+    phase = 0.0
+
+    for a in range(0, len(f0), block_frames):
+        b = min(a + block_frames, len(f0))
+        y, phase = _render(f0, runs, sr, hop, a, b, phase,
+                           amp, harmonics, envelope, fade)
+        yield y
@@ -1,11 +1,74 @@
-import matplotlib.pyplot as plt
+import threading
+import numpy as np
+from src.config import Config
+
+_render_lock = threading.Lock()
+
 
 def plot_pitch(times, f0, beat_times, outpath):
-    plt.figure(figsize=(16,4))
-    plt.plot(times, f0, label="Pitch")
-    for b in beat_times:
-        plt.axvline(b, color="r", alpha=0.2)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(outpath)
-    plt.close()
+    """
+    Server-side PNG fallback. Uses a standalone Agg figure (no pyplot
+    global state), so concurrent requests don't share a current figure.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(16, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(times, f0, label="Pitch")
+    if len(beat_times):
+        ax.vlines(beat_times, 0, 1, transform=ax.get_xaxis_transform(),
+                  color="r", alpha=0.2)
+    ax.legend()
+    fig.tight_layout()
+
+    # Font/text caches inside matplotlib aren't fully thread-safe
+    with _render_lock:
+        fig.savefig(outpath)
+
+
+def _column(values, decimals):
+    return [None if np.isnan(v) else round(float(v), decimals) for v in values]
+
+
+def contour_payload(times, f0, beat_times, notes, width=None, level=None):
+    """
+    Compact, columnar pitch contour for client-side rendering.
+
+    The track is cut into at most `width` equal buckets (one per pixel)
+    and each keeps its min and max pitch, so peaks survive decimation.
+    level: optional normalized RMS per frame (from the FeatureStore);
+    its per-bucket peak is sent as "level".
+    """
+    width = width or Config.CONTOUR_WIDTH
+    n = len(f0)
+    buckets = max(min(width, n), 1)
+    hop_s = float(times[1] - times[0]) if n > 1 else 0.0
+
+    if n:
+        edges = np.linspace(0, n, buckets + 1).astype(int)[:-1]
+        with np.errstate(invalid="ignore"):
+            lo = np.fmin.reduceat(f0, edges)
+            hi = np.fmax.reduceat(f0, edges)
+        starts = times[edges]
+    else:
+        edges = lo = hi = starts = np.array([], dtype=int)
+
+    payload = {
+        "version": 1,
+        "duration": float(n * hop_s),
+        "t": _column(starts, 3),
+        "min": _column(lo, 2),
+        "max": _column(hi, 2),
+        "beats": _column(np.asarray(beat_times), 3),
+        "notes": {
+            "start": [round(x["start"], 3) for x in notes],
+            "end": [round(x["end"], 3) for x in notes],
+            "midi": [x["midi"] for x in notes],
+        },
+    }
+    if level is not None and len(level) >= n:
+        peak = np.maximum.reduceat(level[:n], edges) if n else []
+        payload["level"] = _column(peak, 3)
+    return payload
@@ -0,0 +1,100 @@
+"""
+Cheap pre-check that decides whether an upload needs vocal separation.
+
+A few short excerpts are scored on three cues that separate a
+full mix from an a cappella take: spectral flatness (dense
+accompaniment is noisier than a voice), the percussive share of an
+HPSS split (drums) and the energy below VOCAL_CHECK_LOW_HZ (bass and
+kick; sung fundamentals sit above it).
+"""
+import numpy as np
+from src.config import Config
+from src.audio_io import load_excerpt
+from src.features import FeatureStore
+
+N_FFT = 2048
+HOP = 512
+
+
+def _evidence(value, threshold):
+    """
+    0..1 evidence of accompaniment: 0.5 at the threshold, about 0.9 at
+    twice (0.1 at half) the threshold.
+    """
+    ratio = max(value, 1e-12) / threshold
+    return float(1 / (1 + np.exp(-3 * np.log2(ratio))))
+
+
+def mix_cues(y, sr):
+    """
+    Flatness, percussive share and low-frequency share of the
+    non-silent frames of y, or None if y is silent.
+    """
+    import librosa
+
+    S = FeatureStore(y, sr).stft_mag(N_FFT, HOP)
+    power = S ** 2
+    energy = power.sum(axis=0)
+    active = energy > 1e-3 * energy.max() if energy.size else energy
+    if not np.any(active):
+        return None
+
+    S, power = S[:, active], power[:, active]
+    harmonic, percussive = librosa.decompose.hpss(S)
+    h, p = np.sum(harmonic ** 2), np.sum(percussive ** 2)
+    freqs = librosa.fft_frequencies(sr=sr, n_fft=N_FFT)
+
+    return {
+        "flatness": float(np.median(librosa.feature.spectral_flatness(S=S))),
+        "percussive": float(p / (h + p + 1e-12)),
+        "low_freq": float(power[freqs < Config.VOCAL_CHECK_LOW_HZ].sum() / power.sum()),
+    }
+
+
+def decide(cues):
+    """
+    {"separate": bool, "confidence": 0..1, "cues": {...}} from mix_cues().
+
+    Any one cue is enough to call it a mix (a bass line alone means
+    accompaniment), so the strongest evidence decides. Without usable
+    audio, separation stays on with zero confidence.
+    """
+    if cues is None:
+        return {"separate": True, "confidence": 0.0, "cues": None}
+
+    p = max([
+        _evidence(cues["flatness"], Config.VOCAL_CHECK_FLATNESS),
+        _evidence(cues["percussive"], Config.VOCAL_CHECK_PERCUSSIVE),
+        _evidence(cues["low_freq"], Config.VOCAL_CHECK_LOW_SHARE),
+    ])
+    return {
+        "separate": bool(p >= 0.5),
+        "confidence": round(float(abs(p - 0.5) * 2), 3),
+        "cues": {k: round(v, 4) for k, v in cues.items()},
+    }
+
+
+def check_vocal(path, duration=None, y=None):
+    """
+    Decide whether `path` needs separation from VOCAL_CHECK_EXCERPTS
+    excerpts of VOCAL_CHECK_SECONDS, spread evenly over the file.
+
+    y: the upload already decoded (mono, Config.SAMPLE_RATE); excerpts
+    are sliced from it instead of read from `path`.
+    """
+    sr = Config.SAMPLE_RATE
+    length = Config.VOCAL_CHECK_SECONDS
+    count = Config.VOCAL_CHECK_EXCERPTS
+    if y is not None:
+        duration = len(y) / sr
+
+    if duration is None or duration <= length * count:
+        offsets, length = [0.0], length * count
+    else:
+        offsets = np.linspace(0, duration - length, count + 2)[1:-1]
+
+    if y is None:
+        parts = [load_excerpt(path, sr, float(o), length)[0] for o in offsets]
+    else:
+        parts = [y[int(o * sr):int((o + length) * sr)] for o in offsets]
+    return decide(mix_cues(np.concatenate(parts), sr))
@@ -0,0 +1,103 @@
+import threading, time
+import numpy as np
+from src.config import Config
+
+# Warm-up progress of this process, served by /healthz (app.py, src/api.py)
+state = {"ready": False, "stage": None, "error": None, "seconds": None}
+_thread = None
+_lock = threading.Lock()
+
+
+def warm_models():
+    """
+    Load Demucs and CREPE in this process so the first analysis doesn't
+    pay for it. Missing optional backends are skipped.
+    """
+    from src.separation import _get_model
+    try:
+        _get_model()
+    except ImportError as e:
+        print("Demucs not preloaded:", e)
+
+    from src.crepe_backend import get_model
+    try:
+        get_model()
+    except ImportError as e:
+        print("CREPE not preloaded:", e)
+
+
+def dummy_inference():
+    """
+    Run every stage once on a second of synthetic audio: this triggers
+    the heavy imports, numba JIT in librosa (pYIN, beat tracking) and
+    the first TensorFlow / torch graph execution.
+    """
+    from src.separation import separate_vocals
+    from src.pitch import extract_pitch_vocal
+    from src.rhythm import detect_beats
+
+    sr = Config.SAMPLE_RATE
+    t = np.arange(sr) / sr
+    y = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+    try:
+        separate_vocals(np.zeros((2, Config.SEPARATION_SR), dtype=np.float32),
+                        Config.SEPARATION_SR)
+    except ImportError as e:
+        print("Demucs warm-up skipped:", e)
+
+    try:
+        import matplotlib.pyplot  # noqa: F401 (import cost only)
+    except ImportError as e:
+        print("matplotlib warm-up skipped:", e)
+
+    detect_beats(y, sr, Config.HOP_LENGTH)
+    try:
+        extract_pitch_vocal(y, sr)
+    except ImportError as e:
+        print("CREPE warm-up skipped:", e)
+
+
+def warm_up():
+    """
+    warm_models() + dummy_inference(), recording progress in `state`.
+    Runs once per process; concurrent callers wait for the first.
+    """
+    with _lock:
+        if state["ready"]:
+            return
+        _warm_up()
+
+
+def health():
+    """Readiness body for /healthz."""
+    return dict(state, status="ready" if state["ready"] else "warming_up")
+
+
+def _warm_up():
+    start = time.time()
+    state["error"] = None
+    try:
+        state["stage"] = "models"
+        warm_models()
+        state["stage"] = "dummy_inference"
+        dummy_inference()
+        state["ready"] = True
+    except Exception as e:
+        state["error"] = repr(e)
+        print("Warm-up failed:", e)
+    finally:
+        state["stage"] = None
+        state["seconds"] = time.time() - start
+
+
+def warm_up_in_background():
+    """
+    Start warm_up() on a daemon thread (once) so the server can accept
+    connections immediately.
+    """
+    global _thread
+    if _thread is None:
+        _thread = threading.Thread(target=warm_up, daemon=True)
+        _thread.start()
+    return _thread
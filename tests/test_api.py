@@ -0,0 +1,39 @@
+import os
+import numpy as np
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    # src.api serves ./dist and writes uploads/ and outputs/ in the cwd
+    from fastapi.testclient import TestClient
+
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("api"))
+    os.makedirs("dist")
+    try:
+        from src.api import app
+        yield TestClient(app)
+    finally:
+        os.chdir(cwd)
+
+
+def test_ws_pitch_rejects_bad_sample_rate(client):
+    with client.websocket_connect("/ws/pitch?sr=10") as ws:
+        assert "error" in ws.receive_json()
+        with pytest.raises(WebSocketDisconnect):
+            ws.receive_json()
+
+
+def test_ws_pitch_reports_bad_frames(client):
+    with client.websocket_connect("/ws/pitch?sr=16000") as ws:
+        ws.send_bytes(b"\x00" * 6)
+        assert "error" in ws.receive_json()
+        ws.send_text("hello")
+        assert "error" in ws.receive_json()
+
+        # The socket stays usable: silence comes back as unvoiced frames
+        ws.send_bytes(np.zeros(4096, dtype=np.float32).tobytes())
+        events = ws.receive_json()["events"]
+        assert events and all(e["f0"] is None for e in events if e["type"] == "pitch")
@@ -0,0 +1,23 @@
+import json
+import pytest
+from src.batch import _write_parquet
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def test_parquet_keeps_error_and_ok_records(tmp_path):
+    records = [
+        {"path": "a.wav", "status": "error", "error": "ValueError('bad')", "seconds": 0.1},
+        {"path": "b.wav", "status": "ok", "seconds": 2.5, "tempo": 120.0,
+         "notes": [{"midi": 60, "start": 0.0}], "contour": {"t": [0.0], "f0": [261.6]}},
+    ]
+    path = str(tmp_path / "results.parquet")
+    _write_parquet(records, path)
+
+    rows = pq.read_table(path).to_pylist()
+    assert rows[0]["error"] == "ValueError('bad')"
+    assert rows[0]["notes"] is None and rows[0]["tempo"] is None
+    assert rows[1]["error"] is None
+    assert rows[1]["tempo"] == 120.0
+    assert json.loads(rows[1]["notes"]) == records[1]["notes"]
+    assert json.loads(rows[1]["contour"]) == records[1]["contour"]
@@ -0,0 +1,29 @@
+import os
+import numpy as np
+from src.cache import ResultCache
+
+
+def _disk_size(root):
+    return sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in os.walk(root) for f in fs)
+
+
+def test_running_total_bounds_size_with_few_scans(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path), max_bytes=50_000)
+    scans = []
+    evict = cache._evict
+    monkeypatch.setattr(cache, "_evict", lambda: scans.append(1) or evict())
+
+    for i in range(300):
+        cache.put(f"{i:064x}", np.zeros(64))   # ~700 bytes each
+        assert _disk_size(str(tmp_path)) <= 50_000
+        assert cache._size == _disk_size(str(tmp_path))
+    assert len(scans) < 300 // 5
+
+    # Overwriting a key replaces its size instead of adding to it
+    before = cache._size
+    cache.put(f"{299:064x}", np.zeros(64))
+    assert cache._size == before
+
+    # The most recent entries survive
+    assert cache.get(f"{299:064x}") is not None
+    assert cache.get(f"{0:064x}") is None
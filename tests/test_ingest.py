@@ -0,0 +1,40 @@
+import numpy as np
+import soundfile as sf
+from src.ingest import ingest
+
+
+def _write(path, seconds=20, sr=44100):
+    t = np.arange(int(seconds * sr)) / sr
+    sf.write(path, 0.3 * np.sin(2 * np.pi * 440 * t), sr)
+    return sr
+
+
+def test_mp3_excerpt_matches_full_decode(tmp_path):
+    path = str(tmp_path / "take.mp3")
+    sr = _write(path)
+    full = sf.read(path, dtype="float32")[0]
+
+    for offset in (0.0, 3.3, 12.0):
+        y = ingest(path, (sr,), mono=True, offset=offset, duration=2.0)[sr]
+        start = int(offset * sr)
+        np.testing.assert_allclose(y, full[start:start + len(y)], atol=1e-5)
+        assert len(y) == 2 * sr
+
+
+def test_rates_from_one_decode(tmp_path):
+    path = str(tmp_path / "take.wav")
+    sr = _write(path, seconds=5)
+    out = ingest(path, (sr, 22050))
+
+    assert out[sr].shape == (1, 5 * sr)
+    assert abs(out[22050].shape[1] - 5 * 22050) <= 1
+    np.testing.assert_array_equal(out[sr][0], sf.read(path, dtype="float32")[0])
+
+
+def test_native_rate(tmp_path):
+    path = str(tmp_path / "take.wav")
+    sr = _write(path, seconds=2, sr=48000)
+    out = ingest(path, (22050, None))
+
+    assert sorted(out) == [22050, sr]
+    np.testing.assert_array_equal(out[sr][0], sf.read(path, dtype="float32")[0])
@@ -0,0 +1,43 @@
+import threading
+from src.metrics import StageMetrics, timed_stage
+
+
+def test_overlapping_stages_are_not_exclusive():
+    timings_a, timings_b = {}, {}
+    started, release = threading.Event(), threading.Event()
+
+    def other():
+        with timed_stage(timings_b, "pitch"):
+            started.set()
+            release.wait()
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    started.wait()
+    with timed_stage(timings_a, "rhythm"):
+        pass
+    release.set()
+    thread.join()
+
+    alone = {}
+    with timed_stage(alone, "notes"):
+        pass
+
+    assert not timings_a["rhythm"]["exclusive"]
+    assert not timings_b["pitch"]["exclusive"]
+    assert alone["notes"]["exclusive"]
+
+
+def test_cache_hits_stay_out_of_the_histogram():
+    timings = {}
+    with timed_stage(timings, "notes") as timer:
+        timer["cached"] = True
+    with timed_stage(timings, "pitch"):
+        pass
+
+    metrics = StageMetrics()
+    metrics.observe(timings)
+    text = metrics.render()
+    assert 'voicecoach_stage_cache_hits_total{stage="notes"} 1' in text
+    assert 'voicecoach_stage_seconds_count{stage="notes"}' not in text
+    assert 'voicecoach_stage_seconds_count{stage="pitch"} 1' in text
@@ -0,0 +1,91 @@
+import numpy as np
+from src.pitch import _limit_jumps, _veto
+
+
+def _limit_jumps_loop(f0):
+    """The original per-frame jump limiter."""
+    f0 = np.copy(f0)
+    for i in range(1, len(f0)):
+        if np.isnan(f0[i]) or np.isnan(f0[i-1]):
+            continue
+
+        cents = abs(1200 * np.log2(f0[i] / f0[i-1]))
+        if cents > 600:
+            ratio = f0[i] / f0[i-1]
+            if 1.9 < ratio < 2.1:
+                f0[i] = f0[i] / 2
+            elif 0.45 < ratio < 0.55:
+                f0[i] = f0[i] * 2
+            else:
+                f0[i] = f0[i-1]
+    return f0
+
+
+def _veto_loop(f0_smooth, f0_pyin, conf):
+    """The original per-frame pYIN veto."""
+    f0_final = np.copy(f0_smooth)
+    for i in range(len(f0_final)):
+        if np.isnan(f0_smooth[i]) or np.isnan(f0_pyin[i]):
+            continue
+
+        cents_diff = abs(1200 * np.log2(f0_smooth[i] / f0_pyin[i]))
+        if cents_diff > 120 and conf[i] < 0.75:
+            f0_final[i] = np.nan
+    return f0_final
+
+
+def _track(rng, n):
+    """
+    Sung-looking f0 with NaN runs, octave errors (single frames and
+    runs, which chain corrections), wild jumps and exact zeros.
+    """
+    f0 = 220 * 2 ** np.cumsum(rng.normal(0, 0.02, n))
+    for _ in range(n // 20):
+        a = rng.integers(0, n)
+        b = a + rng.integers(1, 12)
+        kind = rng.integers(0, 5)
+        if kind == 0:
+            f0[a:b] = np.nan
+        elif kind == 1:
+            f0[a:b] *= rng.choice([2.0, 0.5, 1.95, 0.52, 4.0, 0.25])
+        elif kind == 2:
+            f0[a:b] *= rng.uniform(0.3, 3.0)
+        elif kind == 3:
+            f0[a] = 0.0
+        else:
+            f0[a:b] = f0[a]
+    return f0
+
+
+def test_limit_jumps_matches_loop():
+    rng = np.random.default_rng(0)
+    for n in [0, 1, 2, 3, 10, 100, 1000]:
+        for _ in range(20):
+            f0 = _track(rng, n)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                expected = _limit_jumps_loop(f0)
+                got = _limit_jumps(f0)
+            np.testing.assert_array_equal(got, expected)
+
+
+def test_limit_jumps_chained_octaves():
+    # Each frame of an octave-up run is corrected against the corrected
+    # frame before it, so the whole run comes down
+    f0 = np.array([200, 400, 404, 408, np.nan, 400, 200], dtype=float)
+    expected = _limit_jumps_loop(f0)
+    np.testing.assert_array_equal(_limit_jumps(f0), expected)
+    np.testing.assert_array_equal(expected[:4], [200, 200, 202, 204])
+
+
+def test_veto_matches_loop():
+    rng = np.random.default_rng(1)
+    for n in [0, 1, 50, 1000]:
+        for _ in range(20):
+            f0 = _track(rng, n)
+            f0_pyin = f0 * 2 ** (rng.normal(0, 0.1, n))
+            f0_pyin[rng.random(n) < 0.2] = np.nan
+            f0_pyin[rng.random(n) < 0.1] *= 2
+            conf = rng.random(n)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                expected = _veto_loop(f0, f0_pyin, conf)
+            np.testing.assert_array_equal(_veto(f0.copy(), f0_pyin, conf), expected)
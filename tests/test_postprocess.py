@@ -0,0 +1,88 @@
+import numpy as np
+from src.postprocess import enforce_beatwise_pitch
+
+
+def _enforce_beatwise_pitch_loop(times, f0, beat_times, max_flat_cents=80, min_frames=5):
+    """The original per-beat loop."""
+    f0_out = np.copy(f0)
+    last_pitch = np.nan
+
+    for i in range(len(beat_times) - 1):
+        start = beat_times[i]
+        end = beat_times[i + 1]
+
+        idx = np.where((times >= start) & (times < end))[0]
+        if len(idx) < min_frames:
+            continue
+
+        segment = f0[idx]
+        valid = segment[~np.isnan(segment)]
+
+        if len(valid) > 0:
+            center = np.median(valid)
+            cents = 1200 * np.log2(valid / center)
+
+            if np.std(cents) < max_flat_cents:
+                f0_out[idx] = center
+                last_pitch = center
+            else:
+                f0_out[idx] = f0[idx]
+                last_pitch = np.nanmedian(valid)
+
+        else:
+            if not np.isnan(last_pitch):
+                next_pitch = None
+                for j in idx:
+                    if j + 1 < len(f0) and not np.isnan(f0[j + 1]):
+                        next_pitch = f0[j + 1]
+                        break
+
+                if next_pitch is not None:
+                    cents = abs(1200 * np.log2(next_pitch / last_pitch))
+                    if cents < 200:
+                        f0_out[idx] = last_pitch
+
+    return f0_out
+
+
+def _track(rng, n):
+    """Held notes (flat or with vibrato), glides and NaN gaps."""
+    f0 = np.empty(n)
+    i = 0
+    while i < n:
+        length = rng.integers(1, 40)
+        pitch = rng.uniform(150, 600)
+        t = np.arange(min(length, n - i))
+        kind = rng.integers(0, 4)
+        if kind == 0:
+            f0[i:i + length] = np.nan
+        elif kind == 1:
+            f0[i:i + length] = pitch * 2 ** (rng.normal(0, 0.005, len(t)))
+        elif kind == 2:
+            f0[i:i + length] = pitch * 2 ** (0.1 * np.sin(t / 2))
+        else:
+            f0[i:i + length] = pitch * 2 ** (t / 12)
+        i += length
+    return f0
+
+
+def test_matches_loop():
+    rng = np.random.default_rng(0)
+    for n in [0, 1, 5, 50, 500]:
+        for _ in range(30):
+            times = np.arange(n) * 0.01
+            f0 = _track(rng, n)
+            duration = max(n, 1) * 0.01
+            beat_times = np.sort(rng.uniform(-0.1, duration + 0.1, rng.integers(0, 40)))
+            if rng.random() < 0.3:
+                beat_times = np.round(beat_times, 1)    # repeated beats
+            min_frames = int(rng.integers(1, 8))
+
+            expected = _enforce_beatwise_pitch_loop(times, f0, beat_times, min_frames=min_frames)
+            got = enforce_beatwise_pitch(times, f0, beat_times, min_frames=min_frames)
+            np.testing.assert_array_equal(got, expected)
+
+
+def test_empty_track():
+    out = enforce_beatwise_pitch(np.array([]), np.array([]), [0.0, 0.5, 1.0])
+    assert len(out) == 0
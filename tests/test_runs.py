@@ -0,0 +1,148 @@
+import numpy as np
+import librosa
+import pytest
+from src.config import Config
+from src.notes import CHANGE_THRESH, MIN_NOTE_FRAMES, make_note, segment_notes_from_pitch
+from src.pitch_track import PitchTrack
+from src.postprocess import bridge_short_gaps
+from src.runs import run_bounds, run_indices, run_median
+
+
+def _runs_loop(mask, breaks=None):
+    runs, start = [], None
+    for i, m in enumerate(mask):
+        if start is not None and (not m or (breaks is not None and breaks[i])):
+            runs.append((start, i))
+            start = None
+        if m and start is None:
+            start = i
+    if start is not None:
+        runs.append((start, len(mask)))
+    return runs
+
+
+def _bridge_short_gaps_loop(f0, max_gap_frames=12):
+    """The original gap bridging loop."""
+    f0 = np.copy(f0)
+    isnan = np.isnan(f0)
+
+    i = 0
+    while i < len(f0):
+        if isnan[i]:
+            j = i
+            while j < len(f0) and isnan[j]:
+                j += 1
+
+            gap = j - i
+            if gap <= max_gap_frames and i > 0 and j < len(f0):
+                f0[i:j] = f0[i - 1]
+
+            i = j
+        else:
+            i += 1
+
+    return f0
+
+
+def _segment_notes_loop(pitch):
+    """The original note segmentation loop, reading a PitchTrack."""
+    times = pitch.times
+    f0 = pitch.f0
+
+    midi = librosa.hz_to_midi(np.maximum(f0, 1e-6, dtype=np.float64))
+    voiced = ~np.isnan(f0)
+
+    notes = []
+    current = []
+
+    for i in range(1, len(f0)):
+        if not voiced[i]:
+            if current and len(current) >= MIN_NOTE_FRAMES:
+                notes.append(current)
+            current = []
+            continue
+
+        if not current:
+            current = [i]
+            continue
+
+        if abs(midi[i] - midi[current[-1]]) > CHANGE_THRESH:
+            if len(current) >= MIN_NOTE_FRAMES:
+                notes.append(current)
+            current = [i]
+        else:
+            current.append(i)
+
+    if current and len(current) >= MIN_NOTE_FRAMES:
+        notes.append(current)
+
+    hop = times[1] - times[0] if len(times) > 1 else 0.01
+    final_notes = []
+    for seg in notes:
+        note = make_note(times[seg[0]], times[seg[-1]] + hop, midi[seg])
+        if note is not None:
+            final_notes.append(note)
+    return final_notes
+
+
+def _track(rng, n):
+    """Notes of random length (with steps inside some) between NaN gaps."""
+    f0 = np.full(n, np.nan)
+    i = 0
+    while i < n:
+        length = int(rng.integers(1, 60))
+        if rng.random() < 0.6:
+            f0[i:i + length] = rng.uniform(100, 800) * 2 ** (rng.normal(0, 0.003, len(f0[i:i + length])))
+            if rng.random() < 0.3:
+                f0[i + length // 2:i + length] *= 2 ** (rng.uniform(-4, 4) / 12)
+        i += length
+    return f0
+
+
+def test_run_kernels_match_loops():
+    rng = np.random.default_rng(0)
+    for n in [0, 1, 2, 10, 200]:
+        for _ in range(30):
+            mask = rng.random(n) < rng.uniform(0.1, 0.9)
+            breaks = rng.random(n) < 0.1 if rng.random() < 0.5 else None
+            runs = _runs_loop(mask, breaks)
+
+            starts, ends = run_bounds(mask, breaks)
+            assert list(zip(starts, ends)) == runs
+
+            idx, run = run_indices(starts, ends)
+            np.testing.assert_array_equal(idx, [i for a, b in runs for i in range(a, b)])
+            np.testing.assert_array_equal(run, [k for k, (a, b) in enumerate(runs) for _ in range(a, b)])
+
+            if runs:
+                values = rng.normal(size=n)
+                expected = [np.median(values[a:b]) for a, b in runs]
+                np.testing.assert_array_equal(run_median(values, starts, ends), expected)
+
+
+def test_bridge_short_gaps_matches_loop():
+    rng = np.random.default_rng(1)
+    for n in [0, 1, 5, 300]:
+        for _ in range(30):
+            f0 = _track(rng, n)
+            gap = int(rng.integers(0, 20))
+            expected = _bridge_short_gaps_loop(f0, gap)
+            np.testing.assert_array_equal(bridge_short_gaps(f0, gap), expected)
+            np.testing.assert_array_equal(bridge_short_gaps(f0.copy(), gap, inplace=True), expected)
+
+
+def test_segment_notes_matches_loop():
+    rng = np.random.default_rng(2)
+    for n in [0, 1, 6, 500, 2000]:
+        for _ in range(20):
+            f0 = _track(rng, n)
+            pitch = PitchTrack(f0, np.ones(n), Config.SAMPLE_RATE, Config.HOP_LENGTH)
+
+            expected = _segment_notes_loop(pitch)
+            got = segment_notes_from_pitch(pitch)
+            assert len(got) == len(expected)
+            for a, b in zip(got, expected):
+                for key in ("start", "end", "duration", "midi", "note_name"):
+                    assert a[key] == b[key]
+                for key in ("cents_off_mean", "cents_off_std"):
+                    assert a[key] == pytest.approx(b[key], abs=1e-9)
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from src.config import Config
+from src.scoring import Reference, _align, _cost, _dtw_band, score_takes
+
+
+def _naive_dtw(ref, take, lo=None, hi=None):
+    c = _cost(ref[:, None], take[None, :])
+    D = np.full((len(ref) + 1, len(take) + 1), np.inf)
+    D[0, 0] = 0
+    for i in range(len(ref)):
+        for j in range(len(take)):
+            if lo is None or lo[i] <= j < hi[i]:
+                D[i + 1, j + 1] = c[i, j] + min(D[i, j], D[i, j + 1], D[i + 1, j])
+    return D[-1, -1]
+
+
+def _contour(n, rng):
+    """Notes of 10-60 frames with vibrato and short rests (MIDI, NaN = rest)."""
+    notes = []
+    while sum(len(x) for x in notes) < n:
+        length = rng.integers(10, 60)
+        note = np.full(length, rng.uniform(55, 70)) + 0.2 * np.sin(np.arange(length) / 3)
+        if rng.random() < 0.2:
+            note[-rng.integers(3, 10):] = np.nan
+        notes.append(note)
+    return np.concatenate(notes)[:n]
+
+
+def _warp(midi, rng):
+    """Smoothly time-warped and slightly detuned copy of a contour."""
+    n = len(midi)
+    rate = np.exp(np.cumsum(rng.normal(0, 0.02, n)).clip(-0.4, 0.4))
+    pos = np.cumsum(rate)
+    pos = pos[pos < n - 1]
+    return midi[pos.astype(int)] + rng.normal(0, 0.1)
+
+
+def _reference(midi):
+    return Reference("ref", midi, np.array([0]), np.array([len(midi)]), np.array([60]), 22050, 256)
+
+
+def _padded(takes):
+    m = np.array([len(x) for x in takes])
+    padded = np.full((len(takes), m.max()), np.nan)
+    for t, x in enumerate(takes):
+        padded[t, :len(x)] = x
+    return padded, m
+
+
+def test_band_kernel_matches_naive_dtw():
+    rng = np.random.default_rng(0)
+    for it in range(40):
+        n, M = rng.integers(1, 30), rng.integers(2, 30)
+        ref = rng.normal(60, 2, n)
+        ref[rng.random(n) < 0.2] = np.nan
+        takes = rng.normal(60, 2, (3, M))
+        takes[rng.random((3, M)) < 0.2] = np.nan
+        m = np.array([M, max(2, M - 3), M])
+        for t in range(3):
+            takes[t, m[t]:] = np.nan
+
+        # Full band, then random ragged bands around a monotone path
+        lo = np.zeros((3, n), dtype=int)
+        hi = np.tile(m[:, None], n)
+        if it % 2:
+            for t in range(3):
+                path = np.sort(rng.integers(0, m[t], n))
+                path[0], path[-1] = 0, m[t] - 1
+                nxt = np.append(path[1:], path[-1])
+                lo[t] = np.minimum(np.maximum.accumulate(np.maximum(path - rng.integers(0, 3, n), 0)), path)
+                hi[t] = np.minimum(np.maximum.accumulate(nxt + 1 + rng.integers(0, 3, n)), m[t])
+
+        _, end = _dtw_band(ref, takes, m, lo, hi - lo, chunk=int(rng.integers(1, 8)))
+        for t in range(3):
+            expected = _naive_dtw(ref, takes[t, :m[t]], lo[t], hi[t])
+            assert end[t] == pytest.approx(expected)
+
+
+def test_unbounded_radius_matches_full_dtw(monkeypatch):
+    monkeypatch.setattr(Config, "SCORE_RADIUS", 10 ** 6)
+    monkeypatch.setattr(Config, "SCORE_COARSE_RADIUS", 10 ** 6)
+    rng = np.random.default_rng(1)
+    ref = _reference(_contour(1200, rng))
+    padded, m = _padded([_warp(ref.midi, rng) for _ in range(3)])
+
+    _, _, cost, _ = _align(ref, padded, m)
+    _, full = _dtw_band(ref.midi, padded, m, np.zeros((3, len(ref.midi)), dtype=int), m.max())
+    np.testing.assert_allclose(cost, full)
+
+
+def test_multiscale_close_to_full_dtw():
+    rng = np.random.default_rng(2)
+    ratios = []
+    for _ in range(4):
+        ref = _reference(_contour(1500, rng))
+        padded, m = _padded([_warp(ref.midi, rng) for _ in range(4)])
+        _, _, cost, _ = _align(ref, padded, m)
+        _, full = _dtw_band(ref.midi, padded, m, np.zeros((4, len(ref.midi)), dtype=int), m.max())
+        ratios.extend(cost / full)
+
+    assert min(ratios) >= 1 - 1e-9
+    assert np.mean(ratios) < 1.1
+
+
+def test_batching_does_not_change_scores():
+    rng = np.random.default_rng(3)
+    ref = _reference(_contour(1500, rng))
+    takes = [440 * 2 ** ((_warp(ref.midi, rng) - 69) / 12) for _ in range(7)] + [np.array([])]
+
+    together = score_takes(ref, takes, batch_size=64)
+    batched = score_takes(ref, takes, batch_size=3)
+    assert batched[-1] is None and together[-1] is None
+    for a, b in zip(together[:-1], batched[:-1]):
+        assert a["distance"] == pytest.approx(b["distance"])
+        assert a["pitch_accuracy"] == b["pitch_accuracy"]
@@ -0,0 +1,32 @@
+import numpy as np
+from src.config import Config
+from src.separation import _separation_workers, crossfade, plan_segments
+
+
+def test_segments_cover_input_with_overlap():
+    for n in [0, 1, 9, 10, 29, 30, 31, 100, 101, 119, 1000]:
+        for segment, overlap in [(30, 10), (30, 0), (10, 4), (7, 6)]:
+            bounds = plan_segments(n, segment, overlap)
+            assert bounds[0][0] == 0 and bounds[-1][1] == n
+            assert all(b - a <= segment for a, b in bounds)
+            assert all(b - a == segment for a, b in bounds[:-1])
+            for (a0, b0), (a1, b1) in zip(bounds, bounds[1:]):
+                assert b0 - a1 == overlap
+                assert b1 > b0
+
+
+def test_crossfade_of_identity_parts_is_identity():
+    rng = np.random.default_rng(0)
+    for n in [1, 31, 100, 101, 119, 1000]:
+        for segment, overlap in [(30, 10), (30, 0), (10, 4), (7, 6)]:
+            x = rng.normal(size=n).astype(np.float32)
+            parts = [(a, x[a:b]) for a, b in plan_segments(n, segment, overlap)]
+            np.testing.assert_allclose(crossfade(parts, n, overlap), x, rtol=1e-5, atol=1e-6)
+
+
+def test_no_fork_by_default_with_thread_executor(monkeypatch):
+    monkeypatch.setattr(Config, "SEPARATION_WORKERS", 0)
+    monkeypatch.setattr(Config, "JOB_EXECUTOR", "thread")
+    assert _separation_workers() == 1
+    monkeypatch.setattr(Config, "SEPARATION_WORKERS", 3)
+    assert _separation_workers() == 3
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from src.synthesis import iter_resynthesize_f0, resynthesize_f0
+
+SR, HOP = 22050, 256
+
+
+def _track(rng, n):
+    """Gliding voiced runs separated by NaN gaps."""
+    f0 = 220 * 2 ** np.cumsum(rng.normal(0, 0.01, n))
+    f0[rng.random(n) < 0.05] = np.nan
+    return f0
+
+
+def test_blocks_match_full_render():
+    rng = np.random.default_rng(0)
+    for n in [1, 7, 300]:
+        f0 = _track(rng, n)
+        envelope = rng.uniform(0.5, 1.0, n)
+        for kwargs in [{}, {"harmonics": (1.0, 0.5, 0.25), "envelope": envelope}]:
+            full = resynthesize_f0(f0, SR, HOP, **kwargs)
+            for block_frames in [1, 5, 64, 1000]:
+                blocks = list(iter_resynthesize_f0(f0, SR, HOP, block_frames, **kwargs))
+                assert all(len(b) <= block_frames * HOP for b in blocks)
+                np.testing.assert_allclose(np.concatenate(blocks), full, atol=1e-6)
+
+
+def test_constant_f0_frequency():
+    y = resynthesize_f0(np.full(400, 440.0), SR, HOP, fade_ms=0)
+    assert len(y) == 400 * HOP
+
+    spectrum = np.abs(np.fft.rfft(y * np.hanning(len(y))))
+    peak = np.argmax(spectrum) * SR / len(y)
+    assert peak == pytest.approx(440, abs=SR / len(y))
+
+    crossings = np.count_nonzero(np.diff(np.signbit(y)))
+    assert crossings / 2 / (len(y) / SR) == pytest.approx(440, rel=1e-3)
+
+
+def test_zero_harmonics_rejected():
+    with pytest.raises(ValueError):
+        resynthesize_f0(np.full(10, 440.0), SR, HOP, harmonics=(0.0, 0.0))
+    with pytest.raises(ValueError):
+        list(iter_resynthesize_f0(np.full(10, 440.0), SR, HOP, harmonics=(0.0,)))